@@ -23,12 +23,35 @@ video_model = api.model("Video", {
     })))
 })
 
+video_search_result_model = api.inherit("VideoSearchResult", video_model, {
+    "score": fields.Float(description="Relevance score, higher is better"),
+})
+
 video_input_model = api.model("VideoInput", {
     "path": fields.String,
     "aspect_ratio": fields.String,
     "genre": fields.String,
 })
 
+video_bulk_input_model = api.inherit("VideoBulkInput", video_input_model, {
+    "name": fields.String(description="Display name (default: last segment of the path)"),
+})
+
+video_bulk_row_model = api.model("VideoBulkRow", {
+    "index": fields.Integer(description="Position of the video in the request"),
+    "path": fields.String,
+    "id": fields.Integer(description="ID of the video, if it was registered"),
+    "status": fields.String(description="inserted, updated or rejected"),
+    "error": fields.String(description="Why the video was rejected"),
+})
+
+video_bulk_result_model = api.model("VideoBulkResult", {
+    "inserted": fields.Integer(description="Number of new videos"),
+    "updated": fields.Integer(description="Number of already registered paths whose metadata was updated"),
+    "rejected": fields.Integer(description="Number of videos rejected"),
+    "rows": fields.List(fields.Nested(video_bulk_row_model)),
+})
+
 user_model = api.model("user", {
     "id": fields.Integer,
     "username": fields.String,
@@ -100,13 +123,14 @@ property_value_Filter_model = api.model("PropertyValue", {
     "value": fields.String(required=True, description="Property value"),
 })
 
-# Child property model (1 level deep)
+# Child property model, nested recursively for any depth
 property_child_model = api.model("PropertyChild", {
     "id": fields.Integer(readonly=True),
     "name": fields.String(required=True, description="Child property name"),
     "display_order": fields.Integer(description="Display order"),
     "values": fields.List(fields.Nested(property_value_model)),
 })
+property_child_model["children"] = fields.List(fields.Nested(property_child_model))
 
 # Main property model with children + values
 property_Filter_model = api.model("Property", {
@@ -118,6 +142,28 @@ property_Filter_model = api.model("Property", {
     "children": fields.List(fields.Nested(property_child_model)),
 })
 
+property_value_facet_model = api.inherit("PropertyValueFacet", property_value_Filter_model, {
+    "count": fields.Integer(description="Videos matching the current selection with this value"),
+})
+
+property_child_facet_model = api.model("PropertyChildFacet", {
+    "id": fields.Integer(readonly=True),
+    "name": fields.String(required=True, description="Child property name"),
+    "display_order": fields.Integer(description="Display order"),
+    "values": fields.List(fields.Nested(property_value_facet_model)),
+})
+property_child_facet_model["children"] = fields.List(fields.Nested(property_child_facet_model))
+
+# Same shape as property_Filter_model, with a match count on every value
+property_facet_model = api.model("PropertyFacet", {
+    "id": fields.Integer(readonly=True),
+    "name": fields.String(required=True, description="Property name"),
+    "parent_id": fields.Integer(description="Parent property ID"),
+    "display_order": fields.Integer(description="Display order"),
+    "values": fields.List(fields.Nested(property_value_facet_model)),
+    "children": fields.List(fields.Nested(property_child_facet_model)),
+})
+
 
 video_embedding_model = api.model("VideoEmbedding", {
     "id": fields.Integer(readonly=True),
@@ -125,11 +171,29 @@ video_embedding_model = api.model("VideoEmbedding", {
     "embedding": fields.List(fields.Float, required=True, description="Vector embedding"),
 })
 
+video_embedding_base64_model = api.model("VideoEmbeddingBase64", {
+    "id": fields.Integer(readonly=True),
+    "video_id": fields.Integer(required=True, description="ID of the video"),
+    "dtype": fields.String(description="Element type of the encoded vector (float32 or float16)"),
+    "embedding": fields.String(description="Base64 of the little-endian vector bytes"),
+})
+
 video_embedding_input_model = api.model("VideoEmbeddingInput", {
     "video_id": fields.Integer(required=True, description="ID of the video"),
     "embedding": fields.List(fields.Float, required=True, description="Vector embedding"),
 })
 
+bulk_row_error_model = api.model("BulkRowError", {
+    "index": fields.Integer(description="Position of the row in the request"),
+    "video_id": fields.Integer(description="ID of the video"),
+    "error": fields.String(description="Why the row was rejected"),
+})
+
+video_embedding_bulk_result_model = api.model("VideoEmbeddingBulkResult", {
+    "inserted": fields.Integer(description="Number of embeddings inserted"),
+    "failed": fields.List(fields.Nested(bulk_row_error_model)),
+})
+
 video_description_model = api.model("VideoDescription", {
     "id": fields.Integer(readonly=True),
     "video_id": fields.Integer(required=True, description="ID of the video"),
@@ -139,15 +203,39 @@ video_description_model = api.model("VideoDescription", {
 video_description_input_model = api.model("VideoDescriptionInput", {
     "video_id": fields.Integer(required=True, description="ID of the video"),
     "description": fields.String(required=True, description="Video description text"),
+    "confidence_score": fields.Float(description="Confidence of the description, between 0 and 1 (default 0)"),
+})
+
+video_description_search_result_model = api.inherit("VideoDescriptionSearchResult", video_description_model, {
+    "confidence_score": fields.Float(description="Confidence of the description"),
+    "score": fields.Float(description="Keyword relevance score, higher is better"),
 })
 
 video_property_value_model = api.model("VideoPropertyValue", {
     "id": fields.Integer(readonly=True),
     "video_id": fields.Integer(required=True),
     "property_value_id": fields.Integer(required=True),
+    "confidence_score": fields.Float,
 })
 
 video_property_value_input_model = api.model("VideoPropertyValueInput", {
     "video_id": fields.Integer(required=True, description="ID of the video"),
     "property_value_id": fields.Integer(required=True, description="ID of the property value"),
+    "confidence_score": fields.Float(description="Confidence of the tag, between 0 and 1 (default 0)"),
+})
+
+video_property_value_bulk_row_model = api.model("VideoPropertyValueBulkRow", {
+    "index": fields.Integer(description="Position of the row in the request"),
+    "id": fields.Integer(description="ID of the assignment, if it was written"),
+    "video_id": fields.Integer(description="ID of the video"),
+    "property_value_id": fields.Integer(description="ID of the property value"),
+    "status": fields.String(description="inserted, updated or rejected"),
+    "error": fields.String(description="Why the row was rejected"),
+})
+
+video_property_value_bulk_result_model = api.model("VideoPropertyValueBulkResult", {
+    "inserted": fields.Integer(description="Number of new assignments"),
+    "updated": fields.Integer(description="Number of existing assignments whose confidence was updated"),
+    "rejected": fields.Integer(description="Number of rows rejected"),
+    "rows": fields.List(fields.Nested(video_property_value_bulk_row_model)),
 })
\ No newline at end of file
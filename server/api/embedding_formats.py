@@ -0,0 +1,81 @@
+import base64
+import io
+
+import numpy as np
+
+from db.models import EMBEDDING_DIM
+
+NPY_MIMETYPE = "application/x-npy"
+BINARY_MIMETYPE = "application/octet-stream"
+
+# One binary embedding record: little-endian int64 video id followed by the float32 vector.
+# A raw bulk upload is a concatenation of these records; a .npy upload is an array of them.
+EMBEDDING_RECORD_DTYPE = np.dtype([("video_id", "<i8"), ("embedding", "<f4", (EMBEDDING_DIM,))])
+
+
+def decode_embedding_records(body, mimetype):
+    """
+    Parse a bulk embedding upload into `(video_ids, embeddings)` arrays.
+    Raises ValueError if the payload as a whole is malformed (wrong size, dtype or dimension).
+    """
+    if mimetype == NPY_MIMETYPE:
+        records = np.load(io.BytesIO(body), allow_pickle=False)
+        names = records.dtype.names or ()
+        if records.ndim != 1 or "video_id" not in names or "embedding" not in names:
+            raise ValueError("Expected a 1-d structured array with 'video_id' and 'embedding' fields")
+        if records.dtype["embedding"].shape != (EMBEDDING_DIM,):
+            raise ValueError(
+                f"Expected {EMBEDDING_DIM}-dim embeddings, got shape {records.dtype['embedding'].shape}"
+            )
+    elif mimetype == BINARY_MIMETYPE:
+        if len(body) % EMBEDDING_RECORD_DTYPE.itemsize:
+            raise ValueError(
+                f"Body is not a whole number of {EMBEDDING_RECORD_DTYPE.itemsize}-byte records "
+                f"(int64 video id + {EMBEDDING_DIM} float32)"
+            )
+        records = np.frombuffer(body, dtype=EMBEDDING_RECORD_DTYPE)
+    else:
+        raise ValueError(f"Unsupported content type {mimetype!r}, expected {BINARY_MIMETYPE} or {NPY_MIMETYPE}")
+
+    return records["video_id"].astype(np.int64), records["embedding"].astype(np.float32)
+
+
+JSON_MIMETYPE = "application/json"
+
+# Response formats for embedding reads: float lists, base64 strings inside JSON, or raw records
+EMBEDDING_FORMATS = ("json", "base64", "binary")
+# Wire dtypes for base64/binary responses. float16 halves the size again at ~3 significant digits.
+EMBEDDING_DTYPES = {"float32": "<f4", "float16": "<f2"}
+
+
+def embedding_output_dtype(dtype):
+    """Record dtype of binary responses: int64 embedding id, int64 video id, then the vector."""
+    return np.dtype([
+        ("id", "<i8"),
+        ("video_id", "<i8"),
+        ("embedding", EMBEDDING_DTYPES[dtype], (EMBEDDING_DIM,)),
+    ])
+
+
+def negotiate_embedding_format(requested, accept_mimetypes):
+    """The explicit `format` argument wins; otherwise pick from the Accept header."""
+    if requested:
+        return requested
+    best = accept_mimetypes.best_match([JSON_MIMETYPE, BINARY_MIMETYPE], default=JSON_MIMETYPE)
+    return "binary" if best == BINARY_MIMETYPE else "json"
+
+
+def encode_embedding_records(rows, dtype):
+    """Pack `(id, video_id, embedding)` rows into the binary record format."""
+    records = np.empty(len(rows), dtype=embedding_output_dtype(dtype))
+    if rows:
+        embedding_ids, video_ids, embeddings = zip(*rows)
+        records["id"] = embedding_ids
+        records["video_id"] = video_ids
+        records["embedding"] = np.stack(embeddings)
+    return records.tobytes()
+
+
+def encode_embedding_base64(embedding, dtype):
+    """Little-endian vector bytes in `dtype`, base64 encoded."""
+    return base64.b64encode(np.asarray(embedding, dtype=EMBEDDING_DTYPES[dtype]).tobytes()).decode()
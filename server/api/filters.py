@@ -0,0 +1,45 @@
+from flask_restx import reqparse
+
+
+def add_tag_filter_arguments(parser):
+    """Add the shared `values` tag filter argument to a request parser."""
+    parser.add_argument(
+        "values",
+        type=str,
+        action="append",
+        location="args",
+        help="Property value ids to filter on, comma separated or repeated. "
+             "Values of the same property are OR-ed, different properties are AND-ed. "
+             "`id:min_confidence` (e.g. 12:0.8) only matches tags with at least that confidence_score",
+    )
+    return parser
+
+
+def tag_filter_parser():
+    return add_tag_filter_arguments(reqparse.RequestParser())
+
+
+def parse_value_filters(raw_values):
+    """
+    Flatten `values` arguments ("1,2" or repeated) into a list of unique ids, each of which
+    may carry a minimum confidence ("12:0.8"). Returns `(value_ids, min_confidence)` where
+    `min_confidence` maps the thresholded ids to their threshold (the strictest if repeated).
+    Raises ValueError on malformed ids or thresholds outside [0, 1].
+    """
+    value_ids = []
+    min_confidence = {}
+    for raw in raw_values or []:
+        for part in raw.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            value_id, _, threshold = part.partition(":")
+            value_id = int(value_id)
+            value_ids.append(value_id)
+            if threshold:
+                threshold = float(threshold)
+                if not 0.0 <= threshold <= 1.0:
+                    raise ValueError(f"min_confidence {threshold} is not between 0 and 1")
+                if threshold > 0.0:
+                    min_confidence[value_id] = max(threshold, min_confidence.get(value_id, 0.0))
+    return list(dict.fromkeys(value_ids)), min_confidence
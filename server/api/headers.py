@@ -0,0 +1,11 @@
+"""Response headers shared by the search endpoints of several namespaces."""
+
+# Response header naming the plan a search used
+SEARCH_STRATEGY_HEADER = "X-Search-Strategy"
+# Standard response header carrying the per-stage timing breakdown of a search
+SERVER_TIMING_HEADER = "Server-Timing"
+
+
+def server_timing(timings):
+    """Format `{stage: seconds}` as a Server-Timing header value in milliseconds."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
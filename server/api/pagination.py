@@ -0,0 +1,64 @@
+import base64
+import json
+
+from flask_restx import reqparse, inputs
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Header carrying the cursor for the next page. It is omitted on the last page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Header carrying the total number of matches, for endpoints that know it cheaply.
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def page_parser():
+    """Build a request parser with the shared `limit` / `after` arguments."""
+    parser = reqparse.RequestParser()
+    parser.add_argument(
+        "limit",
+        type=inputs.int_range(1, MAX_PAGE_SIZE),
+        default=DEFAULT_PAGE_SIZE,
+        location="args",
+        help=f"Page size (1-{MAX_PAGE_SIZE})",
+    )
+    parser.add_argument(
+        "after",
+        type=str,
+        location="args",
+        help=f"Cursor returned in the {NEXT_CURSOR_HEADER} header of the previous page",
+    )
+    return parser
+
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row of a page into an opaque token."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a token produced by `encode_cursor`. Raises ValueError if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def page_headers(next_cursor):
+    """Response headers for a page; empty when there is no next page."""
+    return {NEXT_CURSOR_HEADER: str(next_cursor)} if next_cursor is not None else {}
+
+
+def split_page(rows, limit):
+    """
+    Split a `limit + 1` result into the page and a flag telling whether more rows exist.
+    Fetching one extra row avoids a separate COUNT query.
+    """
+    if len(rows) > limit:
+        return rows[:limit], True
+    return rows, False
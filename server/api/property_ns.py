@@ -1,32 +1,55 @@
-from flask import request
-from flask_restx import Resource, Namespace, fields
+from flask import request, current_app
+from flask_restx import Resource, Namespace, fields, marshal
 from extensions import db
 from db.models import Property, PropertyValue
-from api.api_models import property_model, property_input_model, property_Filter_model
-from sqlalchemy.orm import joinedload
+from api.api_models import property_model, property_input_model, property_Filter_model, property_facet_model
+from api.filters import tag_filter_parser, parse_value_filters
+from api.pagination import TOTAL_COUNT_HEADER
+from api.taxonomy_cache import taxonomy_cache
+from search.tag_index import tag_index
+from db.serializers import property_tree
 property_ns = Namespace("properties", description="Property related operations")
 
+facet_parser = tag_filter_parser()
+
+
+def load_filter_tree():
+    """Serialized property tree (top-level properties with nested children and values)."""
+    return property_tree()
+
+
+def cached_filter_tree():
+    """`(tree, body, etag)` for the marshalled property tree, served from the taxonomy cache."""
+    return taxonomy_cache.get(lambda: marshal(load_filter_tree(), property_Filter_model))
+
+
+def with_counts(node, counts):
+    """Copy of a filter tree node with `count` added to every value, at any depth."""
+    return {
+        **node,
+        "values": [{**value, "count": counts.get(value["id"], 0)} for value in node["values"]],
+        "children": [with_counts(child, counts) for child in node.get("children", [])],
+    }
+
+
 # =====================================================
 # Property Endpoints
 # =====================================================
 @property_ns.route("")
 class PropertyListAPI(Resource):
 
-    @property_ns.marshal_list_with(property_Filter_model)
+    @property_ns.response(200, "Success", [property_Filter_model])
+    @property_ns.response(304, "Not modified")
     def get(self):
-        """Get all properties"""
-        from sqlalchemy.orm import joinedload
-
-        properties = (
-            Property.query.options(
-                joinedload(Property.children).joinedload(Property.values),  # children + their values
-                joinedload(Property.values)  # current property’s values
-            )
-            .filter(Property.parent_id.is_(None))
-            .order_by(Property.display_order)
-            .all()
-        )
-        return [prop.to_filter_dict() for prop in properties], 200
+        """
+        Get all properties
+        Served from a process-local cache; send the ETag back in If-None-Match to get a 304.
+        """
+        _, body, etag = cached_filter_tree()
+        response = current_app.response_class(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
 
     @property_ns.expect(property_input_model)
     @property_ns.marshal_with(property_model, code=201)
@@ -40,9 +63,36 @@ class PropertyListAPI(Resource):
         )
         db.session.add(prop)
         db.session.commit()
+        taxonomy_cache.bump()
         return prop
 
 
+@property_ns.route("/facets")
+class PropertyFacetAPI(Resource):
+
+    @property_ns.expect(facet_parser)
+    @property_ns.marshal_list_with(property_facet_model)
+    def get(self):
+        """
+        Get the property tree with per-value match counts for a filter selection.
+        The number of videos matching the whole selection is in the X-Total-Count header.
+        """
+        args = facet_parser.parse_args()
+        try:
+            value_ids, min_confidence = parse_value_filters(args["values"])
+        except ValueError:
+            property_ns.abort(400, "values must be ids or id:min_confidence pairs")
+
+        unknown = tag_index.unknown_values(value_ids)
+        if unknown:
+            property_ns.abort(400, f"Unknown property values: {unknown}")
+
+        counts, total = tag_index.facet_counts(value_ids, min_confidence)
+        tree, _, _ = cached_filter_tree()
+        tree = [with_counts(node, counts) for node in tree]
+        return tree, 200, {TOTAL_COUNT_HEADER: str(total)}
+
+
 @property_ns.route("/<int:property_id>")
 @property_ns.response(404, "Property not found")
 class PropertyAPI(Resource):
@@ -3,6 +3,8 @@ from flask_restx import Resource, Namespace, fields
 from extensions import db
 from db.models import PropertyValue, Property
 from api.api_models import property_value_model, property_value_input_model
+from api.taxonomy_cache import taxonomy_cache
+from search.tag_index import tag_index
 
 property_value_ns = Namespace("property-values", description="PropertyValue related operations")
 
@@ -35,6 +37,8 @@ class PropertyValueListAPI(Resource):
         )
         db.session.add(pv)
         db.session.commit()
+        tag_index.add_value(pv.id, pv.property_id)
+        taxonomy_cache.bump()
         return pv
 
 
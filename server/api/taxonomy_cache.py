@@ -0,0 +1,50 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Also rebuild after this many seconds, so writes made by other worker processes
+# (which cannot bump this process's version) become visible eventually.
+TAXONOMY_CACHE_MAX_AGE = float(os.getenv("TAXONOMY_CACHE_MAX_AGE", "300"))
+
+
+class TaxonomyCache:
+    """
+    Process-local cache of the serialized property tree.
+
+    Entries are keyed by a taxonomy version that the property and property-value write
+    endpoints bump. Each entry keeps the tree, its JSON body and a strong ETag derived
+    from the body, so a hit costs no database work and a revalidation costs no body.
+    """
+
+    def __init__(self, max_age=TAXONOMY_CACHE_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entry = None  # (version, built_at, tree, body, etag)
+
+    def bump(self):
+        """Invalidate the cached tree after a taxonomy write."""
+        with self._lock:
+            self._version += 1
+
+    def get(self, build):
+        """Return `(tree, body, etag)`, calling `build()` for a fresh tree on a miss."""
+        with self._lock:
+            version = self._version
+            entry = self._entry
+        if entry and entry[0] == version and time.monotonic() - entry[1] <= self.max_age:
+            return entry[2:]
+
+        tree = build()
+        body = json.dumps(tree, separators=(",", ":")).encode()
+        etag = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            # Don't store a tree that a concurrent write has already made stale
+            if self._version == version:
+                self._entry = (version, time.monotonic(), tree, body, etag)
+        return tree, body, etag
+
+
+taxonomy_cache = TaxonomyCache()
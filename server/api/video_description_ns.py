@@ -1,11 +1,22 @@
 from flask import request
-from flask_restx import Resource, Namespace, fields
+from flask_restx import Resource, Namespace, fields, inputs
 from extensions import db
 from db.models import VideoDescription, Video
-from api.api_models import video_description_model, video_description_input_model
+from api.api_models import video_description_model, video_description_input_model, video_description_search_result_model
+from api.headers import SEARCH_STRATEGY_HEADER
+from search.lexical import lexical_search, description_index
 
 video_description_ns = Namespace("video-descriptions", description="Video description operations")
 
+description_search_parser = video_description_ns.parser()
+description_search_parser.add_argument("q", type=str, required=True, location="args", help="Keywords to search for")
+description_search_parser.add_argument(
+    "k", type=inputs.int_range(1, 100), default=20, location="args", help="Number of descriptions to return"
+)
+description_search_parser.add_argument(
+    "min_confidence", type=float, default=0.0, location="args", help="Minimum description confidence_score"
+)
+
 # =====================================================
 # VideoDescription Endpoints
 # =====================================================
@@ -27,15 +38,58 @@ class VideoDescriptionListAPI(Resource):
         if not Video.query.get(data["video_id"]):
             video_description_ns.abort(400, "Video ID does not exist")
 
+        confidence_score = data.get("confidence_score") or 0.0
+        if not 0.0 <= confidence_score <= 1.0:
+            video_description_ns.abort(400, "confidence_score must be between 0 and 1")
+
         vd = VideoDescription(
             video_id=data["video_id"],
-            description=data["description"]
+            description=data["description"],
+            confidence_score=confidence_score,
         )
         db.session.add(vd)
         db.session.commit()
+        description_index.add(vd)
         return vd
 
 
+@video_description_ns.route("/search")
+class VideoDescriptionSearchAPI(Resource):
+
+    @video_description_ns.expect(description_search_parser)
+    @video_description_ns.marshal_list_with(video_description_search_result_model)
+    def get(self):
+        """
+        Keyword search over video descriptions, best match first.
+        Only descriptions with confidence_score >= min_confidence are returned; the ranking
+        used (Postgres full-text or in-memory BM25) is in the X-Search-Strategy header.
+        """
+        args = description_search_parser.parse_args()
+        if not args["q"].strip():
+            video_description_ns.abort(400, "q must not be empty")
+        if not 0.0 <= args["min_confidence"] <= 1.0:
+            video_description_ns.abort(400, "min_confidence must be between 0 and 1")
+
+        hits, strategy = lexical_search(args["q"], args["k"], args["min_confidence"])
+        description_ids = [description_id for description_id, _, _ in hits]
+        descriptions = {
+            vd.id: vd for vd in VideoDescription.query.filter(VideoDescription.id.in_(description_ids)).all()
+        } if description_ids else {}
+
+        results = [
+            {
+                "id": description_id,
+                "video_id": video_id,
+                "description": descriptions[description_id].description,
+                "confidence_score": descriptions[description_id].confidence_score,
+                "score": score,
+            }
+            for description_id, video_id, score in hits
+            if description_id in descriptions
+        ]
+        return results, 200, {SEARCH_STRATEGY_HEADER: strategy}
+
+
 @video_description_ns.route("/<int:description_id>")
 @video_description_ns.response(404, "VideoDescription not found")
 class VideoDescriptionAPI(Resource):
@@ -55,4 +109,5 @@ class VideoDescriptionAPI(Resource):
             video_description_ns.abort(404, "VideoDescription not found")
         db.session.delete(vd)
         db.session.commit()
+        description_index.remove(vd)
         return {"message": "VideoDescription deleted successfully"}, 200
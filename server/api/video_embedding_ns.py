@@ -1,11 +1,95 @@
-from flask import request
-from flask_restx import Resource, Namespace, fields
+import json
+import os
+import struct
+
+import numpy as np
+from flask import request, current_app, stream_with_context
+from flask_restx import Resource, Namespace, fields, marshal
 from extensions import db
-from db.models import VideoEmbedding, Video
-from api.api_models import video_embedding_model, video_embedding_input_model
+from db.models import VideoEmbedding, Video, EMBEDDING_DIM
+from api.api_models import (
+    video_embedding_model, video_embedding_input_model, video_embedding_bulk_result_model,
+    video_embedding_base64_model,
+)
+from api.embedding_formats import (
+    decode_embedding_records, negotiate_embedding_format, encode_embedding_records, encode_embedding_base64,
+    EMBEDDING_FORMATS, EMBEDDING_DTYPES, BINARY_MIMETYPE,
+)
+from api.pagination import page_parser, page_headers, split_page
+from db.bulk import insert_embeddings
+from search.ivf import ivf_engine
+from search.semantic import VECTOR_ENGINE
 
 video_embedding_ns = Namespace("video-embeddings", description="Video embedding operations")
 
+# Largest request body POST /video-embeddings/bulk accepts; the whole body is decoded in memory
+MAX_BULK_PAYLOAD_BYTES = int(os.getenv("MAX_BULK_PAYLOAD_BYTES", str(64 * 1024 * 1024)))
+
+MAX_BATCH_IDS = 1000
+EXPORT_CHUNK_SIZE = 1000
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+embedding_list_parser = page_parser()
+
+embedding_format_parser = video_embedding_ns.parser()
+embedding_format_parser.add_argument(
+    "format",
+    choices=EMBEDDING_FORMATS,
+    location="args",
+    help="json (float lists), base64 (JSON with base64 vectors) or binary (packed records). "
+         "Defaults from the Accept header: application/octet-stream selects binary",
+)
+embedding_format_parser.add_argument(
+    "dtype", choices=tuple(EMBEDDING_DTYPES), default="float32", location="args",
+    help="Vector element type for base64 and binary formats",
+)
+
+embedding_batch_parser = embedding_format_parser.copy()
+embedding_batch_parser.add_argument(
+    "ids", type=str, required=True, location="args", help=f"Comma separated embedding ids (at most {MAX_BATCH_IDS})"
+)
+
+embedding_export_parser = video_embedding_ns.parser()
+embedding_export_parser.add_argument(
+    "after", type=int, default=0, location="args", help="Resume after this embedding id"
+)
+embedding_export_parser.add_argument(
+    "format", choices=("ndjson", "binary"), default="ndjson", location="args",
+    help="ndjson (one JSON object per line) or binary (length-prefixed frames of packed records)",
+)
+embedding_export_parser.add_argument(
+    "dtype", choices=tuple(EMBEDDING_DTYPES), default="float32", location="args",
+    help="Vector element type for the binary format",
+)
+
+
+def embedding_response(rows, args, many):
+    """
+    Render `(id, video_id, embedding)` rows in the negotiated format.
+    Binary responses are packed records (int64 id, int64 video id, vector) in `dtype`.
+    """
+    fmt = negotiate_embedding_format(args["format"], request.accept_mimetypes)
+    dtype = args["dtype"]
+    if fmt == "binary":
+        response = current_app.response_class(encode_embedding_records(rows, dtype), mimetype=BINARY_MIMETYPE)
+        response.headers["X-Embedding-Dtype"] = dtype
+        response.headers["X-Embedding-Dim"] = str(EMBEDDING_DIM)
+        return response
+
+    if fmt == "base64":
+        data = [
+            {"id": embedding_id, "video_id": video_id, "dtype": dtype, "embedding": encode_embedding_base64(embedding, dtype)}
+            for embedding_id, video_id, embedding in rows
+        ]
+        model = video_embedding_base64_model
+    else:
+        data = [
+            {"id": embedding_id, "video_id": video_id, "embedding": embedding.tolist()}
+            for embedding_id, video_id, embedding in rows
+        ]
+        model = video_embedding_model
+    return marshal(data if many else data[0], model), 200
+
 
 
 # =====================================================
@@ -14,10 +98,23 @@ video_embedding_ns = Namespace("video-embeddings", description="Video embedding
 @video_embedding_ns.route("")
 class VideoEmbeddingListAPI(Resource):
 
+    @video_embedding_ns.expect(embedding_list_parser)
     @video_embedding_ns.marshal_list_with(video_embedding_model)
     def get(self):
-        """List all video embeddings"""
-        return VideoEmbedding.query.all()
+        """
+        List video embeddings, a page at a time ordered by id.
+        Pass the X-Next-Cursor response header back as `after` to fetch the next page.
+        Use /video-embeddings/export to pull the whole table.
+        """
+        args = embedding_list_parser.parse_args()
+        query = VideoEmbedding.query.order_by(VideoEmbedding.id)
+        if args["after"]:
+            try:
+                query = query.filter(VideoEmbedding.id > int(args["after"]))
+            except ValueError:
+                video_embedding_ns.abort(400, "Invalid cursor")
+        embeddings, has_more = split_page(query.limit(args["limit"] + 1).all(), args["limit"])
+        return embeddings, 200, page_headers(embeddings[-1].id if has_more else None)
 
     @video_embedding_ns.expect(video_embedding_input_model)
     @video_embedding_ns.marshal_with(video_embedding_model, code=201)
@@ -38,17 +135,159 @@ class VideoEmbeddingListAPI(Resource):
         return ve
 
 
+@video_embedding_ns.route("/bulk")
+class VideoEmbeddingBulkAPI(Resource):
+
+    @video_embedding_ns.marshal_with(video_embedding_bulk_result_model, code=201)
+    @video_embedding_ns.response(400, "Malformed payload")
+    @video_embedding_ns.response(411, "Missing Content-Length")
+    @video_embedding_ns.response(413, "Payload larger than MAX_BULK_PAYLOAD_BYTES")
+    def post(self):
+        """
+        Bulk-insert embeddings from a binary payload.
+        Send either `application/octet-stream` (concatenated records of a little-endian int64
+        video id followed by the float32 vector) or `application/x-npy` (a .npy array of such
+        records with `video_id` and `embedding` fields). Valid rows are inserted in a single
+        transaction; rejected rows are reported by index. With VECTOR_ENGINE=ivf, the IVF snapshot
+        is rebuilt in the background afterwards.
+        The body must have a Content-Length of at most MAX_BULK_PAYLOAD_BYTES (64 MiB by
+        default); split larger uploads into several requests.
+        """
+        if request.content_length is None:
+            video_embedding_ns.abort(411, "Content-Length is required")
+        if request.content_length > MAX_BULK_PAYLOAD_BYTES:
+            video_embedding_ns.abort(
+                413, f"Payload is larger than {MAX_BULK_PAYLOAD_BYTES} bytes; split it into several requests"
+            )
+
+        try:
+            video_ids, embeddings = decode_embedding_records(request.get_data(cache=False), request.mimetype)
+        except ValueError as e:
+            video_embedding_ns.abort(400, str(e))
+
+        # Validate every row at once instead of one query per embedding
+        unique_ids = np.unique(video_ids).tolist()
+        known_ids = db.session.execute(
+            db.select(Video.id).where(Video.id.in_(unique_ids))
+        ).scalars().all() if unique_ids else []
+        checks = [
+            (~np.isin(video_ids, known_ids), "Video ID does not exist"),
+            (~np.isfinite(embeddings).all(axis=1), "Embedding contains NaN or infinity"),
+            (~np.any(embeddings != 0, axis=1), "Embedding is all zeros"),
+        ]
+
+        valid = np.ones(len(video_ids), dtype=bool)
+        failed = []
+        for mask, error in checks:
+            mask &= valid  # report each row once, for its first failing check
+            failed.extend(
+                {"index": int(i), "video_id": int(video_ids[i]), "error": error}
+                for i in np.flatnonzero(mask)
+            )
+            valid &= ~mask
+        failed.sort(key=lambda row: row["index"])
+
+        inserted = insert_embeddings(video_ids[valid], embeddings[valid])
+        db.session.commit()
+        if inserted and VECTOR_ENGINE == "ivf":
+            # Searches keep using the current snapshot until the rebuilt one replaces it
+            ivf_engine.rebuild_in_background(current_app._get_current_object())
+        return {"inserted": inserted, "failed": failed}, 201
+
+
+@video_embedding_ns.route("/batch")
+class VideoEmbeddingBatchAPI(Resource):
+
+    @video_embedding_ns.expect(embedding_batch_parser)
+    @video_embedding_ns.response(200, "Success", [video_embedding_model])
+    def get(self):
+        """
+        Get many embeddings by ID in one request, as JSON floats, base64 or binary (see `format`).
+        Unknown ids are skipped; results are ordered by id.
+        """
+        args = embedding_batch_parser.parse_args()
+        try:
+            ids = sorted({int(part) for part in args["ids"].split(",") if part.strip()})
+        except ValueError:
+            video_embedding_ns.abort(400, "ids must be integers")
+        if len(ids) > MAX_BATCH_IDS:
+            video_embedding_ns.abort(400, f"At most {MAX_BATCH_IDS} ids per request")
+
+        rows = db.session.execute(
+            db.select(VideoEmbedding.id, VideoEmbedding.video_id, VideoEmbedding.embedding)
+            .where(VideoEmbedding.id.in_(ids))
+            .order_by(VideoEmbedding.id)
+        ).all() if ids else []
+        return embedding_response(rows, args, many=True)
+
+
+@video_embedding_ns.route("/export")
+class VideoEmbeddingExportAPI(Resource):
+
+    @video_embedding_ns.expect(embedding_export_parser)
+    @video_embedding_ns.response(200, "Streamed export")
+    def get(self):
+        """
+        Stream every embedding with id > `after`, in id order, from a server-side cursor.
+
+        - ndjson: one `{"id", "video_id", "embedding"}` object per line, then a final
+          `{"done": true, "last_id": ...}` line
+        - binary: frames of a little-endian uint32 byte length followed by packed records
+          (int64 id, int64 video id, vector in `dtype`), then a zero-length frame
+
+        Memory stays bounded by one chunk. If the stream breaks, restart with `after` set to
+        the last id received; a missing end marker means the export was cut short.
+        """
+        args = embedding_export_parser.parse_args()
+        fmt = args["format"]
+        dtype = args["dtype"]
+        result = db.session.execute(
+            db.select(VideoEmbedding.id, VideoEmbedding.video_id, VideoEmbedding.embedding)
+            .where(VideoEmbedding.id > args["after"])
+            .order_by(VideoEmbedding.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+
+        def generate():
+            last_id = args["after"]
+            for rows in result.partitions():
+                last_id = rows[-1][0]
+                if fmt == "binary":
+                    payload = encode_embedding_records(rows, dtype)
+                    yield struct.pack("<I", len(payload)) + payload
+                else:
+                    yield "".join(
+                        json.dumps({"id": embedding_id, "video_id": video_id, "embedding": embedding.tolist()}) + "\n"
+                        for embedding_id, video_id, embedding in rows
+                    )
+            if fmt == "binary":
+                yield struct.pack("<I", 0)
+            else:
+                yield json.dumps({"done": True, "last_id": last_id}) + "\n"
+
+        response = current_app.response_class(
+            stream_with_context(generate()),
+            mimetype=BINARY_MIMETYPE if fmt == "binary" else NDJSON_MIMETYPE,
+        )
+        if fmt == "binary":
+            response.headers["X-Embedding-Dtype"] = dtype
+            response.headers["X-Embedding-Dim"] = str(EMBEDDING_DIM)
+        return response
+
+
 @video_embedding_ns.route("/<int:embedding_id>")
 @video_embedding_ns.response(404, "VideoEmbedding not found")
 class VideoEmbeddingAPI(Resource):
 
-    @video_embedding_ns.marshal_with(video_embedding_model)
+    @video_embedding_ns.expect(embedding_format_parser)
+    @video_embedding_ns.response(200, "Success", video_embedding_model)
     def get(self, embedding_id):
-        """Get a video embedding by ID"""
+        """Get a video embedding by ID, as JSON floats, base64 or binary (see `format`)"""
+        args = embedding_format_parser.parse_args()
         ve = VideoEmbedding.query.get(embedding_id)
         if not ve:
             video_embedding_ns.abort(404, "VideoEmbedding not found")
-        return ve
+        return embedding_response([(ve.id, ve.video_id, ve.embedding)], args, many=False)
 
     def delete(self, embedding_id):
         """Delete a video embedding by ID"""
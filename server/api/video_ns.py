@@ -1,32 +1,128 @@
-from flask_restx import Namespace, Resource, fields
-from flask import jsonify
+import numpy as np
+from flask_restx import Namespace, Resource, fields, inputs
+from flask import jsonify, current_app, request
 from extensions import db
-from db.models import Video, Property, PropertyValue, VideoPropertyValue
-from api.api_models import video_model, video_input_model
+from db.models import Video
+from db.serializers import videos_to_dicts
+from api.api_models import (
+    video_model, video_input_model, video_search_result_model, video_bulk_input_model, video_bulk_result_model,
+)
+from api.pagination import page_parser, encode_cursor, decode_cursor, page_headers, split_page, TOTAL_COUNT_HEADER
+from api.filters import add_tag_filter_arguments, parse_value_filters
+from api.headers import SEARCH_STRATEGY_HEADER, SERVER_TIMING_HEADER, server_timing
+from search.tag_index import tag_index
+from search.encoders import get_text_encoder
+from search.semantic import semantic_search, AGGREGATIONS, DEFAULT_TOP_M, QUANTIZED_SEARCH
+from search.hybrid import hybrid_search, RRF_K
+from db.bulk import upsert_videos
 from datetime import datetime
-from sqlalchemy.orm import joinedload
+from sqlalchemy import tuple_
 
 # Create a Namespace for videos
 video_ns = Namespace("videos", description="Video related operations")
 
+video_list_parser = page_parser()
+video_list_parser.add_argument(
+    "order_by",
+    choices=("id", "created_at"),
+    default="id",
+    location="args",
+    help="Sort key for the cursor",
+)
+
+video_search_parser = add_tag_filter_arguments(page_parser())
+video_search_parser.add_argument(
+    "order_by",
+    choices=("id", "confidence"),
+    default="id",
+    location="args",
+    help="Order by id, or by the summed confidence of the selected tags (highest first)",
+)
+
+semantic_search_parser = add_tag_filter_arguments(video_ns.parser())
+semantic_search_parser.add_argument("q", type=str, required=True, location="args", help="Text query")
+semantic_search_parser.add_argument(
+    "k", type=inputs.int_range(1, 100), default=20, location="args", help="Number of videos to return"
+)
+semantic_search_parser.add_argument(
+    "agg",
+    choices=AGGREGATIONS,
+    default="max",
+    location="args",
+    help="How frame scores combine per video: best frame (max) or mean of the best m frames (mean)",
+)
+semantic_search_parser.add_argument(
+    "m", type=inputs.int_range(1, 50), default=DEFAULT_TOP_M, location="args", help="Frames averaged by agg=mean"
+)
+semantic_search_parser.add_argument(
+    "quantized", type=inputs.boolean, default=QUANTIZED_SEARCH, location="args",
+    help="Search the binary-quantized index and rerank with full-precision vectors (needs QUANTIZED_SEARCH=1)",
+)
+
+hybrid_search_parser = semantic_search_parser.copy()
+hybrid_search_parser.add_argument(
+    "min_confidence", type=float, default=0.0, location="args", help="Minimum confidence_score of matched descriptions"
+)
+hybrid_search_parser.add_argument(
+    "rrf_k", type=inputs.int_range(1, 1000), default=RRF_K, location="args", help="Reciprocal rank fusion constant"
+)
+
+MAX_BULK_VIDEOS = 10_000
+VIDEO_METADATA_FIELDS = ("name", "aspect_ratio", "genre")
+
+def ranked_videos(hits):
+    """Serialize `(video_id, score)` hits in rank order, with the score on each video."""
+    video_ids = [video_id for video_id, _ in hits]
+    videos = {video.id: video for video in Video.query.filter(Video.id.in_(video_ids)).all()} if video_ids else {}
+    scores = dict(hits)
+    ordered = [videos[video_id] for video_id in video_ids if video_id in videos]
+    return [{**data, "score": scores[data["id"]]} for data in videos_to_dicts(ordered)]
+
 # Define the Video API
 @video_ns.route("")
 class VideoListAPI(Resource):
+    @video_ns.expect(video_list_parser)
     @video_ns.marshal_with(video_model, as_list=True)
     def get(self):
         """
-        Get all videos
+        Get a page of videos.
+        Pass the X-Next-Cursor response header back as `after` to fetch the next page.
         """
-        from sqlalchemy.orm import joinedload
+        args = video_list_parser.parse_args()
+        limit = args["limit"]
+        after = args["after"]
+
+        query = Video.query
+        if args["order_by"] == "created_at":
+            query = query.order_by(Video.created_at, Video.id)
+            if after:
+                try:
+                    created_at, last_id = decode_cursor(after)
+                    created_at = datetime.fromisoformat(created_at)
+                    last_id = int(last_id)
+                except (ValueError, TypeError):
+                    video_ns.abort(400, "Invalid cursor")
+                query = query.filter(tuple_(Video.created_at, Video.id) > (created_at, last_id))
+        else:
+            query = query.order_by(Video.id)
+            if after:
+                try:
+                    last_id = int(after)
+                except ValueError:
+                    video_ns.abort(400, "Invalid cursor")
+                query = query.filter(Video.id > last_id)
+
+        videos = query.limit(limit + 1).all()
+        videos, has_more = split_page(videos, limit)
 
-        videos = Video.query.options(
-            joinedload(Video.video_property_values)  # load the join table
-            .joinedload(VideoPropertyValue.property_value)  # load the PropertyValue
-            .joinedload(PropertyValue.property)  # load the Property
-            .joinedload(Property.parent),  # load the immediate parent
-            joinedload(Video.descriptions)  # also load descriptions
-        ).all()
-        return [video.to_dict() for video in videos], 200
+        next_cursor = None
+        if has_more:
+            last = videos[-1]
+            if args["order_by"] == "created_at":
+                next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+            else:
+                next_cursor = last.id
+        return videos_to_dicts(videos), 200, page_headers(next_cursor)
 
     @video_ns.expect(video_input_model)
     @video_ns.marshal_with(video_model)
@@ -48,8 +144,180 @@ class VideoListAPI(Resource):
         )
         db.session.add(new_video)
         db.session.commit()
+        tag_index.add_video(new_video.id)
         return new_video.to_dict(), 201
 
+@video_ns.route("/bulk")
+class VideoBulkAPI(Resource):
+    @video_ns.expect([video_bulk_input_model])
+    @video_ns.marshal_with(video_bulk_result_model)
+    @video_ns.response(400, "Malformed payload")
+    def post(self):
+        """
+        Register many videos at once, upserting on path.
+        Takes a list of {path, name, aspect_ratio, genre}; a path that is already registered keeps
+        its id and gets the metadata that was sent. All valid videos are written in one transaction
+        and each row reports its id and status by index. If a path repeats, its last row wins.
+        """
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, list):
+            video_ns.abort(400, "Expected a JSON list of videos")
+        if len(payload) > MAX_BULK_VIDEOS:
+            video_ns.abort(400, f"At most {MAX_BULK_VIDEOS} videos per request")
+
+        results = [{"index": i, "status": "rejected"} for i in range(len(payload))]
+        pending = {}  # path -> (index, row) of the row that will be written
+        for i, raw in enumerate(payload):
+            if not isinstance(raw, dict) or not isinstance(raw.get("path"), str) or not raw["path"].strip():
+                results[i]["error"] = "path must be a non-empty string"
+                continue
+            results[i]["path"] = raw["path"]
+            if any(raw.get(field) is not None and not isinstance(raw[field], str) for field in VIDEO_METADATA_FIELDS):
+                results[i]["error"] = f"{', '.join(VIDEO_METADATA_FIELDS)} must be strings"
+                continue
+            if raw["path"] in pending:
+                results[pending[raw["path"]][0]]["error"] = "Superseded by a later row for the same path"
+            pending[raw["path"]] = (i, {"path": raw["path"], **{field: raw.get(field) for field in VIDEO_METADATA_FIELDS}})
+
+        written = upsert_videos([row for _, row in pending.values()]) if pending else []
+        db.session.commit()
+
+        for video_id, path, inserted in written:
+            results[pending[path][0]].update(id=video_id, status="inserted" if inserted else "updated")
+            if inserted:
+                tag_index.add_video(video_id)
+
+        inserted = sum(1 for result in results if result["status"] == "inserted")
+        return {
+            "inserted": inserted,
+            "updated": len(written) - inserted,
+            "rejected": len(results) - len(written),
+            "rows": results,
+        }, 200
+
+@video_ns.route("/search")
+class VideoSearchAPI(Resource):
+    @video_ns.expect(video_search_parser)
+    @video_ns.marshal_with(video_search_result_model, as_list=True)
+    def get(self):
+        """
+        Filter videos by property values.
+        Values of the same property are OR-ed, different properties are AND-ed; `id:min_confidence`
+        only matches tags with at least that confidence. Results are ordered by id, or with
+        order_by=confidence by the summed confidence of the selected tags (the score).
+        The total match count is in the X-Total-Count header.
+        """
+        args = video_search_parser.parse_args()
+        limit = args["limit"]
+        after = args["after"]
+        try:
+            value_ids, min_confidence = parse_value_filters(args["values"])
+        except ValueError:
+            video_ns.abort(400, "values must be ids or id:min_confidence pairs")
+
+        unknown = tag_index.unknown_values(value_ids)
+        if unknown:
+            video_ns.abort(400, f"Unknown property values: {unknown}")
+
+        matches = tag_index.match(value_ids, min_confidence)
+        if args["order_by"] == "confidence" and value_ids:
+            last = None
+            if after:
+                try:
+                    last_score, last_id = decode_cursor(after)
+                    last = (float(last_score), int(last_id))
+                except (ValueError, TypeError):
+                    video_ns.abort(400, "Invalid cursor")
+            page, has_more = split_page(tag_index.rank_by_confidence(value_ids, min_confidence, limit + 1, last), limit)
+            next_cursor = encode_cursor(page[-1][1], page[-1][0]) if has_more else None
+            hits = page
+        else:
+            try:
+                after = int(after) if after else None
+            except ValueError:
+                video_ns.abort(400, "after must be an integer")
+            start = matches.rank(after) if after is not None else 0
+            page_ids, has_more = split_page(list(matches[start:start + limit + 1]), limit)
+            next_cursor = page_ids[-1] if has_more else None
+            hits = [(video_id, None) for video_id in page_ids]
+
+        headers = page_headers(next_cursor)
+        headers[TOTAL_COUNT_HEADER] = str(len(matches))
+        return ranked_videos(hits), 200, headers
+
+@video_ns.route("/semantic")
+class VideoSemanticSearchAPI(Resource):
+    @video_ns.expect(semantic_search_parser)
+    @video_ns.marshal_with(video_search_result_model, as_list=True)
+    def get(self):
+        """
+        Text-to-video search over the video embeddings, optionally restricted by tag filters.
+        Returns up to k distinct videos ranked by cosine similarity to the encoded query,
+        combining each video's frame embeddings according to agg; the plan
+        used (exact or ANN) is in the X-Search-Strategy header.
+        """
+        args = semantic_search_parser.parse_args()
+        if not args["q"].strip():
+            video_ns.abort(400, "q must not be empty")
+        if args["quantized"] and not QUANTIZED_SEARCH:
+            video_ns.abort(400, "Quantized search is not enabled on this server")
+        try:
+            value_ids, min_confidence = parse_value_filters(args["values"])
+        except ValueError:
+            video_ns.abort(400, "values must be ids or id:min_confidence pairs")
+
+        candidates = None
+        if value_ids:
+            unknown = tag_index.unknown_values(value_ids)
+            if unknown:
+                video_ns.abort(400, f"Unknown property values: {unknown}")
+            candidates = tag_index.match(value_ids, min_confidence)
+
+        query_vector = get_text_encoder().encode(args["q"])
+        if not np.any(query_vector):
+            # Nothing the encoder recognises (e.g. only punctuation): cosine similarity is undefined
+            video_ns.abort(400, "q has no searchable terms")
+        hits, strategy = semantic_search(
+            query_vector, args["k"], candidates, tag_index.video_count(), args["agg"], args["m"], args["quantized"]
+        )
+        return ranked_videos(hits), 200, {SEARCH_STRATEGY_HEADER: strategy}
+
+@video_ns.route("/hybrid")
+class VideoHybridSearchAPI(Resource):
+    @video_ns.expect(hybrid_search_parser)
+    @video_ns.marshal_with(video_search_result_model, as_list=True)
+    def get(self):
+        """
+        Hybrid search: keyword search over descriptions and semantic search over embeddings,
+        run concurrently and merged with reciprocal rank fusion (score = fused RRF score).
+        Both plans are in the X-Search-Strategy header and the per-stage timings
+        (lexical, encode, semantic including encode, fuse, total) in the Server-Timing header.
+        """
+        args = hybrid_search_parser.parse_args()
+        if not args["q"].strip():
+            video_ns.abort(400, "q must not be empty")
+        if args["quantized"] and not QUANTIZED_SEARCH:
+            video_ns.abort(400, "Quantized search is not enabled on this server")
+        if not 0.0 <= args["min_confidence"] <= 1.0:
+            video_ns.abort(400, "min_confidence must be between 0 and 1")
+        try:
+            value_ids, min_confidence = parse_value_filters(args["values"])
+        except ValueError:
+            video_ns.abort(400, "values must be ids or id:min_confidence pairs")
+
+        candidates = None
+        if value_ids:
+            unknown = tag_index.unknown_values(value_ids)
+            if unknown:
+                video_ns.abort(400, f"Unknown property values: {unknown}")
+            candidates = tag_index.match(value_ids, min_confidence)
+
+        hits, strategy, timings = hybrid_search(
+            current_app._get_current_object(), args["q"], args["k"], candidates, tag_index.video_count(),
+            args["min_confidence"], args["agg"], args["m"], args["quantized"], args["rrf_k"],
+        )
+        return ranked_videos(hits), 200, {SEARCH_STRATEGY_HEADER: strategy, SERVER_TIMING_HEADER: server_timing(timings)}
+
 @video_ns.route("/<string:query>")
 class VideoAPI(Resource):
     @video_ns.marshal_with(video_model)
@@ -59,7 +327,7 @@ class VideoAPI(Resource):
         else:   
             videos = Video.query.filter_by(genre=query).all()
 
-        return [video.to_dict() for video in videos], 200
+        return videos_to_dicts(videos), 200
 
 @video_ns.route("/<int:id>")
 class VideoByIdAPI(Resource):
@@ -68,17 +336,11 @@ class VideoByIdAPI(Resource):
         """
         Get a video by ID
         """
-        video = Video.query.options(
-            joinedload(Video.video_property_values)
-            .joinedload(VideoPropertyValue.property_value)
-            .joinedload(PropertyValue.property)
-            .joinedload(Property.parent),
-            joinedload(Video.descriptions)
-        ).get(id)
+        video = Video.query.get(id)
         
         if not video:
             return {"error": "Video not found"}, 404
-        return video.to_dict(), 200
+        return videos_to_dicts([video])[0], 200
 
     @video_ns.expect(video_input_model)
     @video_ns.marshal_with(video_model)
@@ -105,6 +367,7 @@ class VideoByIdAPI(Resource):
             return jsonify({"error": "Video not found"}), 404
         db.session.delete(video)
         db.session.commit()
+        tag_index.remove_video(id)
         return jsonify({"message": "Video deleted"}), 200
     
 # @video_ns.route("/<int:id>")
@@ -2,10 +2,35 @@ from flask import request
 from flask_restx import Resource, Namespace, fields
 from extensions import db
 from db.models import VideoPropertyValue, Video, PropertyValue
-from api.api_models import video_property_value_model, video_property_value_input_model
+from api.api_models import (
+    video_property_value_model, video_property_value_input_model, video_property_value_bulk_result_model,
+)
+from db.bulk import upsert_video_property_values
+from search.tag_index import tag_index
 
 video_property_value_ns = Namespace("video-property-values", description="VideoPropertyValue operations")
 
+MAX_BULK_ROWS = 50_000
+
+
+def validate_tag_row(row):
+    """Return the normalized row, or an error message for a malformed one."""
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+    video_id = row.get("video_id")
+    property_value_id = row.get("property_value_id")
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in (video_id, property_value_id)):
+        return None, "video_id and property_value_id must be integers"
+    confidence_score = row.get("confidence_score") or 0.0
+    if isinstance(confidence_score, bool) or not isinstance(confidence_score, (int, float)) \
+            or not 0.0 <= confidence_score <= 1.0:
+        return None, "confidence_score must be between 0 and 1"
+    return {
+        "video_id": video_id,
+        "property_value_id": property_value_id,
+        "confidence_score": float(confidence_score),
+    }, None
+
 
 
 # =====================================================
@@ -43,14 +68,90 @@ class VideoPropertyValueListAPI(Resource):
         if existing:
             video_property_value_ns.abort(400, "This property value is already assigned to the video")
 
+        confidence_score = data.get("confidence_score") or 0.0
+        if not 0.0 <= confidence_score <= 1.0:
+            video_property_value_ns.abort(400, "confidence_score must be between 0 and 1")
+
         vpv = VideoPropertyValue(
             video_id=data["video_id"],
-            property_value_id=data["property_value_id"]
+            property_value_id=data["property_value_id"],
+            confidence_score=confidence_score,
         )
         db.session.add(vpv)
         db.session.commit()
+        tag_index.add(vpv.video_id, vpv.property_value_id)
         return vpv
 
+
+@video_property_value_ns.route("/bulk")
+class VideoPropertyValueBulkAPI(Resource):
+
+    @video_property_value_ns.expect([video_property_value_input_model])
+    @video_property_value_ns.marshal_with(video_property_value_bulk_result_model)
+    @video_property_value_ns.response(400, "Malformed payload")
+    def post(self):
+        """
+        Assign property values to videos in bulk, upserting on (video_id, property_value_id).
+        Takes a list of {video_id, property_value_id, confidence_score}; an existing assignment
+        keeps its id and gets the new confidence_score. Foreign keys are checked in one query and
+        all valid rows are written in one transaction; each row reports its status by index.
+        If a pair repeats, its last row wins.
+        """
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, list):
+            video_property_value_ns.abort(400, "Expected a JSON list of rows")
+        if len(payload) > MAX_BULK_ROWS:
+            video_property_value_ns.abort(400, f"At most {MAX_BULK_ROWS} rows per request")
+
+        results = [{"index": i, "status": "rejected"} for i in range(len(payload))]
+        pending = {}  # (video_id, property_value_id) -> (index, row) of the row that will be written
+        for i, raw in enumerate(payload):
+            row, error = validate_tag_row(raw)
+            if error:
+                results[i]["error"] = error
+                continue
+            key = (row["video_id"], row["property_value_id"])
+            results[i].update(video_id=key[0], property_value_id=key[1])
+            if key in pending:
+                results[pending[key][0]]["error"] = "Superseded by a later row for the same video and property value"
+            pending[key] = (i, row)
+
+        # Validate every foreign key in one round trip
+        video_ids = {video_id for video_id, _ in pending}
+        value_ids = {value_id for _, value_id in pending}
+        known = set(db.session.execute(
+            db.union_all(
+                db.select(db.literal("video"), Video.id).where(Video.id.in_(video_ids)),
+                db.select(db.literal("property_value"), PropertyValue.id).where(PropertyValue.id.in_(value_ids)),
+            )
+        ).all()) if pending else set()
+
+        rows = []
+        for (video_id, value_id), (i, row) in pending.items():
+            if ("video", video_id) not in known:
+                results[i]["error"] = "Video does not exist"
+            elif ("property_value", value_id) not in known:
+                results[i]["error"] = "PropertyValue does not exist"
+            else:
+                rows.append(row)
+
+        written = upsert_video_property_values(rows) if rows else []
+        db.session.commit()
+
+        for vpv_id, video_id, value_id, inserted in written:
+            result = results[pending[(video_id, value_id)][0]]
+            result.update(id=vpv_id, status="inserted" if inserted else "updated")
+            if inserted:
+                tag_index.add(video_id, value_id)
+
+        inserted = sum(1 for result in results if result["status"] == "inserted")
+        return {
+            "inserted": inserted,
+            "updated": len(written) - inserted,
+            "rejected": len(results) - len(written),
+            "rows": results,
+        }, 200
+
 # @video_property_value_ns.route("/<int:id>")
 # @video_property_value_ns.response(404, "VideoPropertyValue not found")
 # class VideoPropertyValueAPI(Resource):
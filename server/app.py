@@ -11,6 +11,7 @@ from api.property_value_ns import property_value_ns
 from api.video_embedding_ns import video_embedding_ns
 from api.video_description_ns import video_description_ns
 from api.video_property_value_ns import video_property_value_ns
+from api.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
 
 # Load environment variables
 load_dotenv()
@@ -22,7 +23,7 @@ def create_app():
 
     api.init_app(app)
     db.init_app(app)
-    cors.init_app(app, origins='*') # TODO: update this later on to the frontend origin
+    cors.init_app(app, origins='*', expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER]) # TODO: update this later on to the frontend origin
     # login_manager.init_app(app)
 
     #api.add_namespace(ns)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+ANN recall/latency benchmark for the video embedding index.
+
+Generates clustered synthetic datasets shaped like the CLIP frame embeddings, computes
+exact ground truth with NumPy, then sweeps index build parameters and search parameters
+of each backend and writes one JSON object per configuration (recall@k, p50/p99 latency,
+build time, index size).
+
+Backends:
+- exact:    NumPy brute force; the latency baseline (recall is 1 by definition)
+- pgvector: HNSW on a temporary table in the database from DATABASE_URL, sweeping
+            m / ef_construction and hnsw.ef_search
+- ivf:      the in-process IVF-flat engine (search.ivf), sweeping nlist and nprobe
+
+Can be run from the server directory with:
+    python3 -m benchmarks.ann_benchmark --sizes 10000,100000 --backends exact,pgvector
+"""
+
+import argparse
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the server directory to the Python path so we can import from it
+current_dir = Path(__file__).resolve().parent
+server_dir = current_dir.parent
+if str(server_dir) not in sys.path:
+    sys.path.insert(0, str(server_dir))
+
+from db.models import EMBEDDING_DIM
+
+GROUND_TRUTH_BATCH = 256  # queries per brute-force matrix multiply
+
+
+# =====================================================
+# Data
+# =====================================================
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_dataset(n, n_queries, dim=EMBEDDING_DIM, n_clusters=100, spread=0.35, seed=0):
+    """
+    Unit vectors drawn around `n_clusters` random centers, like frames of many videos that
+    each cluster around their shots. Queries come from the same distribution.
+    """
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((n_clusters, dim), dtype=np.float32))
+
+    def sample(count):
+        assignments = rng.integers(n_clusters, size=count)
+        noise = rng.standard_normal((count, dim), dtype=np.float32) * (spread / np.sqrt(dim))
+        return normalize(centers[assignments] + noise).astype(np.float32)
+
+    return sample(n), sample(n_queries)
+
+
+def exact_neighbors(data, queries, k):
+    """Row indices of the k most cosine-similar vectors per query, best first."""
+    neighbors = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), GROUND_TRUTH_BATCH):
+        sims = queries[start:start + GROUND_TRUTH_BATCH] @ data.T
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1)
+        neighbors[start:start + GROUND_TRUTH_BATCH] = np.take_along_axis(top, order, axis=1)
+    return neighbors
+
+
+def recall_at_k(found, truth):
+    """Mean fraction of the true k neighbors present in each result list."""
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def summarize(latencies_s):
+    p50, p99 = np.percentile(np.asarray(latencies_s) * 1000, [50, 99])
+    return {"p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3)}
+
+
+# =====================================================
+# Backends
+# =====================================================
+def bench_exact(data, queries, truth, k, args):
+    latencies = []
+    found = []
+    for query in queries:
+        started = time.perf_counter()
+        sims = data @ query
+        top = np.argpartition(-sims, k - 1)[:k]
+        found.append(top[np.argsort(-sims[top])])
+        latencies.append(time.perf_counter() - started)
+    yield {"recall": recall_at_k(found, truth), **summarize(latencies), "build_s": 0.0, "index_bytes": 0}
+
+
+def bench_pgvector(data, queries, truth, k, args):
+    from app import create_app
+    from extensions import db
+    from db.bulk import vector_literal, copy_rows
+
+    app = create_app()
+    with app.app_context(), db.engine.connect() as conn:
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.exec_driver_sql(
+            f"CREATE TEMP TABLE ann_benchmark (id integer PRIMARY KEY, embedding vector({data.shape[1]}))"
+        )
+        cursor = conn.connection.cursor()
+        buffer = io.StringIO()
+        for i, vector in enumerate(data.tolist()):
+            buffer.write(f"{i}\t{vector_literal(vector)}\n")
+        buffer.seek(0)
+        copy_rows(cursor, "COPY ann_benchmark (id, embedding) FROM STDIN", buffer)
+        cursor.close()
+        conn.exec_driver_sql("ANALYZE ann_benchmark")
+
+        query_literals = [vector_literal(query) for query in queries.tolist()]
+        search = db.text("SELECT id FROM ann_benchmark ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k")
+
+        for m in args.m:
+            for ef_construction in args.ef_construction:
+                conn.exec_driver_sql("DROP INDEX IF EXISTS ann_benchmark_hnsw")
+                started = time.perf_counter()
+                conn.exec_driver_sql(
+                    "CREATE INDEX ann_benchmark_hnsw ON ann_benchmark USING hnsw (embedding vector_cosine_ops) "
+                    f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+                )
+                build_s = time.perf_counter() - started
+                index_bytes = conn.exec_driver_sql("SELECT pg_relation_size('ann_benchmark_hnsw')").scalar()
+
+                for ef_search in args.ef_search:
+                    conn.exec_driver_sql(f"SET hnsw.ef_search = {int(ef_search)}")
+                    latencies = []
+                    found = []
+                    for q in query_literals:
+                        started = time.perf_counter()
+                        found.append(conn.execute(search, {"q": q, "k": k}).scalars().all())
+                        latencies.append(time.perf_counter() - started)
+                    yield {
+                        "m": m,
+                        "ef_construction": ef_construction,
+                        "ef_search": ef_search,
+                        "recall": recall_at_k(found, truth),
+                        **summarize(latencies),
+                        "build_s": round(build_s, 3),
+                        "index_bytes": index_bytes,
+                    }
+
+
+def bench_ivf(data, queries, truth, k, args):
+    from search.ivf import IVFIndex, default_nlist
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nlist in args.nlist or [default_nlist(len(data))]:
+            out_dir = Path(tmp) / str(nlist)
+            started = time.perf_counter()
+            index = IVFIndex.build(data, np.arange(len(data)), out_dir, nlist)
+            build_s = time.perf_counter() - started
+            index_bytes = sum(path.stat().st_size for path in out_dir.iterdir())
+
+            for nprobe in args.nprobe:
+                latencies = []
+                found = []
+                for query in queries:
+                    started = time.perf_counter()
+                    ids, _ = index.search(query, k, nprobe)
+                    found.append(ids)
+                    latencies.append(time.perf_counter() - started)
+                yield {
+                    "nlist": index.nlist,
+                    "nprobe": nprobe,
+                    "recall": recall_at_k(found, truth),
+                    **summarize(latencies),
+                    "build_s": round(build_s, 3),
+                    "index_bytes": index_bytes,
+                }
+
+
+BACKENDS = {
+    "exact": bench_exact,
+    "pgvector": bench_pgvector,
+    "ivf": bench_ivf,
+}
+
+
+# =====================================================
+# Main
+# =====================================================
+def int_list(value):
+    return [int(part) for part in value.split(",") if part]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int_list, default=[10_000, 100_000], help="Dataset sizes to benchmark")
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--clusters", type=int, default=100, help="Number of clusters in the synthetic data")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", type=lambda v: v.split(","), default=["exact"], help=f"Any of {sorted(BACKENDS)}")
+    parser.add_argument("--m", type=int_list, default=[16], help="HNSW m values")
+    parser.add_argument("--ef-construction", type=int_list, default=[64], help="HNSW ef_construction values")
+    parser.add_argument("--ef-search", type=int_list, default=[20, 40, 80, 160, 320], help="hnsw.ef_search values")
+    parser.add_argument("--nlist", type=int_list, default=[], help="IVF list counts (default: 4 * sqrt(n))")
+    parser.add_argument("--nprobe", type=int_list, default=[1, 4, 8, 16, 32], help="IVF lists probed per query")
+    parser.add_argument("--output", type=Path, help="Write JSON lines here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    unknown = set(args.backends) - set(BACKENDS)
+    if unknown:
+        raise SystemExit(f"Unknown backends: {sorted(unknown)}")
+
+    out = args.output.open("w") if args.output else sys.stdout
+    try:
+        for n in args.sizes:
+            data, queries = make_dataset(n, args.queries, args.dim, args.clusters, seed=args.seed)
+            truth = exact_neighbors(data, queries, args.k)
+            for backend in args.backends:
+                for result in BACKENDS[backend](data, queries, truth, args.k, args):
+                    record = {"backend": backend, "n": n, "dim": args.dim, "clusters": args.clusters, "k": args.k, **result}
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
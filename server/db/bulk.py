@@ -0,0 +1,123 @@
+import io
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from extensions import db
+from db.models import Video, VideoEmbedding, VideoPropertyValue
+
+# Rows per COPY / multi-row INSERT batch, to bound the size of each buffer sent to the database
+BULK_BATCH_SIZE = 5_000
+
+
+def vector_literal(vector):
+    """pgvector text representation of a vector, e.g. `[1.0,2.0]`."""
+    return "[" + ",".join(map(repr, vector)) + "]"
+
+
+def copy_rows(cursor, sql, buffer):
+    """Run `COPY ... FROM STDIN` with the text in `buffer` on a raw psycopg2 or psycopg 3 cursor."""
+    if hasattr(cursor, "copy_expert"):  # psycopg2
+        cursor.copy_expert(sql, buffer)
+    else:  # psycopg 3
+        with cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def insert_embeddings(video_ids, embeddings):
+    """
+    Insert `(video_id, embedding)` rows in the current transaction, without building ORM objects.
+
+    On Postgres the rows are streamed with COPY; other backends fall back to batched
+    multi-row INSERTs. The caller commits. Returns the number of rows inserted.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == "postgresql":
+        cursor = connection.connection.cursor()
+        try:
+            for start in range(0, len(video_ids), BULK_BATCH_SIZE):
+                buffer = io.StringIO()
+                for video_id, vector in zip(
+                    video_ids[start:start + BULK_BATCH_SIZE].tolist(),
+                    embeddings[start:start + BULK_BATCH_SIZE].tolist(),
+                ):
+                    buffer.write(f"{video_id}\t{vector_literal(vector)}\n")
+                buffer.seek(0)
+                copy_rows(cursor, "COPY video_embedding (video_id, embedding) FROM STDIN", buffer)
+        finally:
+            cursor.close()
+    else:
+        for start in range(0, len(video_ids), BULK_BATCH_SIZE):
+            db.session.execute(
+                db.insert(VideoEmbedding),
+                [
+                    {"video_id": video_id, "embedding": vector}
+                    for video_id, vector in zip(
+                        video_ids[start:start + BULK_BATCH_SIZE].tolist(),
+                        embeddings[start:start + BULK_BATCH_SIZE].tolist(),
+                    )
+                ],
+            )
+    return len(video_ids)
+
+
+def upsert_video_property_values(rows):
+    """
+    Tag videos in bulk: `rows` are dicts with video_id, property_value_id and confidence_score.
+
+    Each batch is one `INSERT ... ON CONFLICT ON CONSTRAINT uq_video_property_value_once
+    DO UPDATE` statement, so re-tagging a video only updates its confidence. Rows must be
+    unique per (video_id, property_value_id) and reference existing videos and values.
+    The caller commits. Returns `(id, video_id, property_value_id, inserted)` per row, where
+    `inserted` is False for rows that updated an existing tag.
+    """
+    results = []
+    for start in range(0, len(rows), BULK_BATCH_SIZE):
+        stmt = pg_insert(VideoPropertyValue).values(rows[start:start + BULK_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_video_property_value_once",
+            set_={"confidence_score": stmt.excluded.confidence_score},
+        ).returning(
+            VideoPropertyValue.id,
+            VideoPropertyValue.video_id,
+            VideoPropertyValue.property_value_id,
+            # xmax is 0 on a freshly inserted row version and set when ON CONFLICT updated it
+            db.literal_column("xmax = 0").label("inserted"),
+        )
+        results.extend(db.session.execute(stmt).all())
+    return results
+
+
+def default_video_name(path):
+    """Name for a video registered without one: the last segment of its path."""
+    return path.rstrip("/").rsplit("/", 1)[-1] or path
+
+
+def upsert_videos(rows):
+    """
+    Register videos in bulk: `rows` are dicts with path, name, aspect_ratio and genre.
+
+    Each batch is one `INSERT ... ON CONFLICT ON CONSTRAINT uq_video_path DO UPDATE`, so
+    registering a known path updates its metadata instead of failing. Metadata left out
+    (None) keeps the stored value; a missing name defaults to the last path segment for new
+    videos and leaves existing names alone, which takes a second statement for those rows.
+    Paths must be unique within `rows`. The caller commits. Returns
+    `(id, path, inserted)` per row, where `inserted` is False for already registered paths.
+    """
+    named = [row for row in rows if row.get("name")]
+    unnamed = [{**row, "name": default_video_name(row["path"])} for row in rows if not row.get("name")]
+
+    results = []
+    for group, update_name in ((named, True), (unnamed, False)):
+        for start in range(0, len(group), BULK_BATCH_SIZE):
+            stmt = pg_insert(Video).values(group[start:start + BULK_BATCH_SIZE])
+            set_ = {
+                "aspect_ratio": db.func.coalesce(stmt.excluded.aspect_ratio, Video.aspect_ratio),
+                "genre": db.func.coalesce(stmt.excluded.genre, Video.genre),
+            }
+            if update_name:
+                set_["name"] = stmt.excluded.name
+            stmt = stmt.on_conflict_do_update(constraint="uq_video_path", set_=set_).returning(
+                Video.id, Video.path, db.literal_column("xmax = 0").label("inserted"),
+            )
+            results.extend(db.session.execute(stmt).all())
+    return results
@@ -1,9 +1,16 @@
+import os
+
 from extensions import db
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, BIT
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
 EMBEDDING_DIM = 768  # set to embedding dimension of the CLIP model. Assuming clip-ViT-L-14
+TEXT_SEARCH_CONFIG = "english"  # Postgres text search configuration used to index descriptions
+# Binary-quantized embeddings and their index are only created, and quantized search only
+# allowed, when QUANTIZED_SEARCH=1 (see VideoEmbedding.embedding_bits)
+QUANTIZED_SEARCH = os.getenv("QUANTIZED_SEARCH", "0") == "1"
 
 # =====================================================
 # Video
@@ -48,6 +55,7 @@ class Video(db.Model):
     __table_args__ = (
         db.UniqueConstraint("path", name="uq_video_path"),
         db.Index("ix_video_name", "name"),
+        db.Index("ix_video_created_at_id", "created_at", "id"),
     )
 
     def __repr__(self):
@@ -124,12 +132,7 @@ class Property(db.Model):
                 {"id": v.id, "value": v.value} for v in self.values
             ],
             "children": [
-                {
-                    "id": child.id,
-                    "name": child.name,
-                    "display_order": child.display_order,
-                    "values": [{"id": v.id, "value": v.value} for v in child.values],
-                }
+                child.to_filter_dict()
                 for child in sorted(self.children, key=lambda c: c.display_order or 0)
             ],
         }
@@ -189,7 +192,14 @@ class VideoPropertyValue(db.Model):
     property_value = db.relationship("PropertyValue")
 
     __table_args__ = (
-        db.Index("ix_video_property_value_property_value_id", "property_value_id"),
+        # Covers "videos tagged with X at confidence >= c" as an index-only scan; its
+        # property_value_id prefix also serves plain lookups by value
+        db.Index(
+            "ix_video_property_value_property_value_id_confidence",
+            property_value_id,
+            confidence_score.desc(),
+            video_id,
+        ),
         db.Index("ix_video_property_value_video_id", "video_id"),
         db.Index("ix_video_property_value_confidence_score", "confidence_score"),
         db.UniqueConstraint("video_id", "property_value_id", name="uq_video_property_value_once"),
@@ -215,9 +225,16 @@ class VideoEmbedding(db.Model):
     # Use pgvector instead of ARRAY
     embedding = db.Column(Vector(EMBEDDING_DIM), nullable=False)
 
+    # Binary-quantized copy of `embedding` (one sign bit per dimension, 32x smaller), kept in sync
+    # by Postgres. Used for a coarse ANN pass whose candidates are reranked with `embedding`.
+    # Optional: left out of CREATE TABLE and added by EMBEDDING_BITS_DDL on Postgres when
+    # QUANTIZED_SEARCH is enabled; only quantized search reads it.
+    embedding_bits = db.deferred(db.Column(BIT(EMBEDDING_DIM), system=True, server_default=db.FetchedValue()))
+
     video = db.relationship("Video", back_populates="embeddings")
 
     __table_args__ = (
+        db.Index("ix_video_embedding_video_id", "video_id"),
         db.Index(
             "ix_video_embedding_hnsw_cos",
             "embedding",
@@ -226,6 +243,8 @@ class VideoEmbedding(db.Model):
             postgresql_with={"m": 16, "ef_construction": 64},
         ),
     )
+    # Do not fetch embedding_bits back after inserts: it is deferred, and usually absent
+    __mapper_args__ = {"eager_defaults": False}
 
     def __repr__(self):
         return f"VideoEmbedding(id={self.id!r}, video_id={self.video_id!r})"
@@ -238,6 +257,21 @@ class VideoEmbedding(db.Model):
         }
 
 
+# Generated column and HNSW index behind quantized search, see QUANTIZED_SEARCH
+EMBEDDING_BITS_DDL = (
+    f"ALTER TABLE video_embedding ADD COLUMN embedding_bits bit({EMBEDDING_DIM}) "
+    f"GENERATED ALWAYS AS (binary_quantize(embedding)::bit({EMBEDDING_DIM})) STORED",
+    "CREATE INDEX ix_video_embedding_bits_hnsw_hamming ON video_embedding "
+    "USING hnsw (embedding_bits bit_hamming_ops) WITH (m = 16, ef_construction = 64)",
+)
+for statement in EMBEDDING_BITS_DDL:
+    db.event.listen(
+        VideoEmbedding.__table__,
+        "after_create",
+        db.DDL(statement).execute_if(dialect="postgresql", callable_=lambda *args, **kwargs: QUANTIZED_SEARCH),
+    )
+
+
 # =====================================================
 # VideoDescription
 # =====================================================
@@ -249,6 +283,11 @@ class VideoDescription(db.Model):
     description = db.Column(db.String, nullable=False)
     confidence_score = db.Column(db.Float, nullable=False, default=0.0)
 
+    # Stemmed lexemes of `description`, kept in sync by Postgres, for full-text search. Left out
+    # of CREATE TABLE and added by SEARCH_VECTOR_DDL on Postgres only; other databases search
+    # descriptions with the in-memory BM25 index instead (see search.lexical).
+    search_vector = db.deferred(db.Column(TSVECTOR, system=True, server_default=db.FetchedValue()))
+
     video = db.relationship("Video", back_populates="descriptions")
 
     __table_args__ = (
@@ -256,12 +295,26 @@ class VideoDescription(db.Model):
         db.Index("ix_video_description_confidence_score", "confidence_score"),
         db.CheckConstraint("confidence_score >= 0.0 AND confidence_score <= 1.0", name="ck_video_description_confidence_score_range"),
     )
+    # Do not fetch search_vector back after inserts: it is deferred, and absent outside Postgres
+    __mapper_args__ = {"eager_defaults": False}
 
     def __repr__(self):
         preview = (self.description[:30] + "…") if self.description and len(self.description) > 30 else self.description
         return f"VideoDescription(id={self.id!r}, video_id={self.video_id!r}, description={preview!r})"
 
 
+# Generated column and GIN index behind Postgres full-text search over descriptions
+SEARCH_VECTOR_DDL = (
+    f"ALTER TABLE video_description ADD COLUMN search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', description)) STORED",
+    "CREATE INDEX ix_video_description_search_vector_gin ON video_description USING gin (search_vector)",
+)
+for statement in SEARCH_VECTOR_DDL:
+    db.event.listen(
+        VideoDescription.__table__, "after_create", db.DDL(statement).execute_if(dialect="postgresql")
+    )
+
+
 # =====================================================
 # User
 # =====================================================
@@ -0,0 +1,139 @@
+from collections import defaultdict
+
+from sqlalchemy import literal
+from sqlalchemy.orm import aliased
+
+from extensions import db
+from db.models import Property, PropertyValue, VideoPropertyValue, VideoDescription
+
+
+def videos_to_dicts(videos):
+    """
+    Serialize videos into the `video_model` payload.
+
+    Produces the same output as `[video.to_dict() for video in videos]`, but tags (with
+    their property and parent property) and descriptions are fetched for the whole batch
+    as flat rows, so the number of queries is constant instead of one lazy load per
+    relationship hop per video.
+    """
+    if not videos:
+        return []
+
+    video_ids = [video.id for video in videos]
+    parent = aliased(Property)
+
+    tag_rows = db.session.execute(
+        db.select(
+            VideoPropertyValue.video_id,
+            Property.id,
+            Property.name,
+            parent.id,
+            parent.name,
+            PropertyValue.id,
+            PropertyValue.value,
+        )
+        .join(PropertyValue, PropertyValue.id == VideoPropertyValue.property_value_id)
+        .join(Property, Property.id == PropertyValue.property_id)
+        .outerjoin(parent, parent.id == Property.parent_id)
+        .where(VideoPropertyValue.video_id.in_(video_ids))
+        .order_by(VideoPropertyValue.id)
+    ).all()
+
+    description_rows = db.session.execute(
+        db.select(VideoDescription.video_id, VideoDescription.description)
+        .where(VideoDescription.video_id.in_(video_ids))
+        .order_by(VideoDescription.id)
+    ).all()
+
+    properties_by_video = defaultdict(list)
+    for video_id, property_id, property_name, parent_id, parent_name, value_id, value in tag_rows:
+        properties_by_video[video_id].append({
+            "property_id": property_id,
+            "property_name": property_name,
+            "parent_property": {"id": parent_id, "name": parent_name} if parent_id is not None else None,
+            "value_id": value_id,
+            "value": value,
+        })
+
+    descriptions_by_video = defaultdict(list)
+    for video_id, description in description_rows:
+        descriptions_by_video[video_id].append(description)
+
+    return [
+        {
+            "id": video.id,
+            "path": video.path,
+            "created_at": video.created_at.isoformat() if video.created_at else None,
+            "aspect_ratio": video.aspect_ratio,
+            "genre": video.genre,
+            "descriptions": descriptions_by_video.get(video.id, []),
+            "properties": properties_by_video.get(video.id, []),
+            "embeddings": None,
+        }
+        for video in videos
+    ]
+
+
+def property_tree():
+    """
+    Serialize the whole property taxonomy into the `Property.to_filter_dict` shape, at any depth.
+
+    The hierarchy is walked with one recursive CTE joined to the property values, so the
+    tree costs a single round trip and is assembled in O(nodes) in Python.
+    """
+    tree = (
+        db.select(
+            Property.id,
+            Property.parent_id,
+            Property.name,
+            Property.display_order,
+            literal(0).label("depth"),
+        )
+        .where(Property.parent_id.is_(None))
+        .cte("property_tree", recursive=True)
+    )
+    child = aliased(Property)
+    tree = tree.union_all(
+        db.select(child.id, child.parent_id, child.name, child.display_order, tree.c.depth + 1)
+        .join(tree, child.parent_id == tree.c.id)
+    )
+
+    rows = db.session.execute(
+        db.select(
+            tree.c.id,
+            tree.c.parent_id,
+            tree.c.name,
+            tree.c.display_order,
+            PropertyValue.id,
+            PropertyValue.value,
+        )
+        .outerjoin(PropertyValue, PropertyValue.property_id == tree.c.id)
+        .order_by(tree.c.depth, tree.c.id, PropertyValue.id)
+    ).all()
+
+    # Rows come ordered by depth, so every parent is created before its children
+    nodes = {}
+    roots = []
+    for property_id, parent_id, name, display_order, value_id, value in rows:
+        node = nodes.get(property_id)
+        if node is None:
+            node = nodes[property_id] = {
+                "id": property_id,
+                "name": name,
+                "parent_id": parent_id,
+                "display_order": display_order,
+                "values": [],
+                "children": [],
+            }
+            if parent_id is None:
+                roots.append(node)
+            else:
+                nodes[parent_id]["children"].append(node)
+        if value_id is not None:
+            node["values"].append({"id": value_id, "value": value})
+
+    for node in nodes.values():
+        node["children"].sort(key=lambda c: c["display_order"] or 0)
+    # Top level matches ORDER BY display_order (NULLs last)
+    roots.sort(key=lambda p: (p["display_order"] is None, p["display_order"] or 0))
+    return roots
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+from db.models import EMBEDDING_DIM
+
+# Which text encoder turns search queries into vectors: "clip" (txtai) or "hashing" (offline stub)
+TEXT_ENCODER = os.getenv("TEXT_ENCODER", "clip")
+CLIP_MODEL_PATH = os.getenv("CLIP_MODEL_PATH", "sentence-transformers/clip-ViT-L-14")
+
+
+class HashingTextEncoder:
+    """
+    Deterministic stand-in encoder for offline tests and local development.
+    Every token is mapped to a fixed pseudo-random direction seeded by its hash, and the
+    query vector is the normalized sum, so texts sharing words land close together.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def _token_vector(self, token):
+        seed = int.from_bytes(hashlib.sha256(token.encode()).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+
+    def encode(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            vector += self._token_vector(token)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class TxtaiTextEncoder:
+    """
+    CLIP text tower through txtai. The default model is clip-ViT-L-14, the same model
+    whose image embeddings are stored in `video_embedding`, so text and frames share a space.
+    """
+
+    def __init__(self, path=CLIP_MODEL_PATH):
+        # Imported lazily: loading txtai pulls in torch and the model weights
+        from txtai.embeddings import Embeddings
+
+        self._embeddings = Embeddings({"path": path, "method": "sentence-transformers"})
+
+    def encode(self, text):
+        return np.asarray(self._embeddings.transform(text), dtype=np.float32)
+
+
+ENCODERS = {
+    "clip": TxtaiTextEncoder,
+    "hashing": HashingTextEncoder,
+}
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_text_encoder():
+    """Process-wide text encoder selected by TEXT_ENCODER, created on first use."""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            if TEXT_ENCODER not in ENCODERS:
+                raise ValueError(f"Unknown TEXT_ENCODER {TEXT_ENCODER!r}, expected one of {sorted(ENCODERS)}")
+            _encoder = ENCODERS[TEXT_ENCODER]()
+        return _encoder
@@ -0,0 +1,94 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from search.encoders import get_text_encoder
+from search.lexical import lexical_search
+from search.semantic import semantic_search, DEFAULT_TOP_M, QUANTIZED_SEARCH
+
+# Rank constant of reciprocal rank fusion: larger values flatten the gap between top ranks
+RRF_K = 60
+# Each ranking contributes this many times k results to the fusion
+HYBRID_FETCH_FACTOR = 2
+# Descriptions fetched per wanted video, since a video can match through several descriptions
+LEXICAL_FETCH_FACTOR = 4
+
+# Shared by all requests; each hybrid query uses two workers, one per ranking
+HYBRID_WORKERS = int(os.getenv("HYBRID_WORKERS", "8"))
+_executor = ThreadPoolExecutor(max_workers=HYBRID_WORKERS, thread_name_prefix="hybrid")
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=RRF_K):
+    """
+    Fuse ranked lists of video ids: each list adds 1 / (rrf_k + rank) to a video's score.
+    Returns `(video_id, score)` pairs, best first.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, video_id in enumerate(ranking, start=1):
+            scores[video_id] += 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _in_app_context(app, fn, *args):
+    # Each worker gets its own app context, hence its own session and database connection
+    started = time.perf_counter()
+    with app.app_context():
+        result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def _lexical_ranking(text, limit, candidates, min_confidence):
+    hits, strategy = lexical_search(text, limit * LEXICAL_FETCH_FACTOR, min_confidence)
+    ranking = []
+    seen = set()
+    for _, video_id, _ in hits:  # hits are best first, so a video's first hit is its best description
+        if video_id not in seen and (candidates is None or video_id in candidates):
+            seen.add(video_id)
+            ranking.append(video_id)
+    return ranking[:limit], strategy
+
+
+def _semantic_ranking(text, limit, candidates, total_videos, aggregate, top_m, quantized):
+    started = time.perf_counter()
+    query_vector = get_text_encoder().encode(text)
+    encode_s = time.perf_counter() - started
+    hits, strategy = semantic_search(query_vector, limit, candidates, total_videos, aggregate, top_m, quantized)
+    return [video_id for video_id, _ in hits], strategy, encode_s
+
+
+def hybrid_search(app, text, k, candidates=None, total_videos=None, min_confidence=0.0, aggregate="max",
+                  top_m=DEFAULT_TOP_M, quantized=QUANTIZED_SEARCH, rrf_k=RRF_K):
+    """
+    Keyword search over descriptions and semantic search over embeddings, fused with
+    reciprocal rank fusion.
+
+    The two rankings run concurrently on the shared worker pool, each in its own app
+    context and database connection, so a query costs about max(lexical, semantic)
+    rather than their sum. `candidates` restricts both rankings to a set of video ids.
+
+    Returns `(hits, strategy, timings)`: hits are `(video_id, fused score)` best first,
+    strategy names both plans (e.g. "fulltext+ann") and timings maps stage -> seconds.
+    """
+    started = time.perf_counter()
+    limit = k * HYBRID_FETCH_FACTOR
+    lexical = _executor.submit(_in_app_context, app, _lexical_ranking, text, limit, candidates, min_confidence)
+    semantic = _executor.submit(
+        _in_app_context, app, _semantic_ranking, text, limit, candidates, total_videos, aggregate, top_m, quantized
+    )
+    (lexical_ranking, lexical_strategy), lexical_s = lexical.result()
+    (semantic_ranking, semantic_strategy, encode_s), semantic_s = semantic.result()
+
+    fuse_started = time.perf_counter()
+    hits = reciprocal_rank_fusion([lexical_ranking, semantic_ranking], rrf_k)[:k]
+    finished = time.perf_counter()
+
+    timings = {
+        "lexical": lexical_s,
+        "encode": encode_s,
+        "semantic": semantic_s,
+        "fuse": finished - fuse_started,
+        "total": finished - started,
+    }
+    return hits, f"{lexical_strategy}+{semantic_strategy}", timings
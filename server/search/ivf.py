@@ -0,0 +1,298 @@
+"""
+In-process IVF-flat vector engine.
+
+An alternative to the pgvector HNSW index for deployments where database round trips
+under concurrent load dominate search latency. A snapshot of `video_embedding` is
+clustered with k-means into inverted lists and stored as .npy files that every worker
+memory-maps, so the page cache is shared and searches are plain matrix multiplies.
+
+Build a snapshot (from the server directory) with:
+    python3 -m search.ivf
+With VECTOR_ENGINE=ivf, POST /video-embeddings/bulk also rebuilds it in the background.
+"""
+
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from extensions import db
+from db.models import VideoEmbedding, EMBEDDING_DIM
+
+IVF_SNAPSHOT_DIR = Path(os.getenv("IVF_SNAPSHOT_DIR", Path(__file__).resolve().parent / "ivf_snapshots"))
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0: derive from the snapshot size
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+
+KMEANS_ITERATIONS = 10
+KMEANS_MAX_TRAIN = 100_000  # vectors sampled to train the centroids
+BATCH_SIZE = 65_536  # vectors per assignment / copy batch while building
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def default_nlist(n):
+    return max(1, min(n, int(4 * np.sqrt(n))))
+
+
+def train_centroids(vectors, nlist, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means on a sample of `vectors`; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), KMEANS_MAX_TRAIN)
+    sample = normalize(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    nlist = min(nlist, sample_size)
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        counts = np.bincount(assignment, minlength=nlist)
+        order = np.argsort(assignment, kind="stable")
+        starts = np.r_[0, np.cumsum(counts)[:-1]]
+        nonempty = counts > 0
+
+        sums = np.empty_like(centroids)
+        sums[nonempty] = np.add.reduceat(sample[order], starts[nonempty], axis=0)
+        # Reseed empty clusters from random sample points
+        sums[~nonempty] = sample[rng.choice(sample_size, int((~nonempty).sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+def assign(vectors, centroids):
+    """Nearest centroid of every vector, computed in batches."""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), BATCH_SIZE):
+        batch = normalize(vectors[start:start + BATCH_SIZE])
+        assignment[start:start + BATCH_SIZE] = np.argmax(batch @ centroids.T, axis=1)
+    return assignment
+
+
+class IVFIndex:
+    """
+    IVF-flat index over unit vectors.
+
+    `vectors` and `video_ids` are stored grouped by inverted list; list `i` occupies rows
+    `offsets[i]:offsets[i + 1]`, so probing a list reads one contiguous block of the mmap.
+    """
+
+    def __init__(self, centroids, vectors, video_ids, offsets):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.video_ids = video_ids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.video_ids)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors, video_ids, out_dir, nlist=None, seed=0):
+        """
+        Cluster `vectors` (array or memmap) and write the index files into `out_dir`.
+        Vectors are copied into list order in batches, so memory stays bounded by the sample.
+        """
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        nlist = nlist or default_nlist(len(vectors))
+
+        centroids = train_centroids(vectors, nlist, seed=seed)
+        assignment = assign(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.r_[0, np.cumsum(np.bincount(assignment, minlength=len(centroids)))].astype(np.int64)
+
+        sorted_vectors = open_memmap(out_dir / "vectors.npy", mode="w+", dtype=np.float32, shape=(len(vectors), vectors.shape[1]))
+        for start in range(0, len(order), BATCH_SIZE):
+            rows = order[start:start + BATCH_SIZE]
+            # Read the source in ascending row order (sequential on a memmap), then restore list order
+            sorted_vectors[start:start + len(rows)] = normalize(vectors[np.sort(rows)])[np.argsort(np.argsort(rows))]
+        sorted_vectors.flush()
+        del sorted_vectors
+
+        np.save(out_dir / "centroids.npy", centroids)
+        np.save(out_dir / "video_ids.npy", np.asarray(video_ids, dtype=np.int64)[order])
+        np.save(out_dir / "offsets.npy", offsets)
+        return cls.load(out_dir)
+
+    @classmethod
+    def load(cls, path):
+        """Open a snapshot; the vectors stay on disk and are paged in on demand."""
+        path = Path(path)
+        return cls(
+            centroids=np.load(path / "centroids.npy"),
+            vectors=np.load(path / "vectors.npy", mmap_mode="r"),
+            video_ids=np.load(path / "video_ids.npy", mmap_mode="r"),
+            offsets=np.load(path / "offsets.npy"),
+        )
+
+    def search_batch(self, queries, k, nprobe=IVF_NPROBE):
+        """
+        The k nearest frames of each query, scanning the `nprobe` closest lists.
+        Returns one `(video_ids, cosine distances)` pair per query, best first.
+        """
+        queries = normalize(np.atleast_2d(queries))
+        nprobe = min(nprobe, self.nlist)
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        results = []
+        for query, lists in zip(queries, probes):
+            blocks = [(self.offsets[i], self.offsets[i + 1]) for i in lists if self.offsets[i + 1] > self.offsets[i]]
+            if not blocks:
+                results.append((np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)))
+                continue
+            sims = np.concatenate([self.vectors[start:end] @ query for start, end in blocks])
+            ids = np.concatenate([self.video_ids[start:end] for start, end in blocks])
+            top = np.argpartition(-sims, min(k, len(sims)) - 1)[:k]
+            top = top[np.argsort(-sims[top])]
+            results.append((ids[top], 1.0 - sims[top]))
+        return results
+
+    def search(self, query, k, nprobe=IVF_NPROBE):
+        return self.search_batch(query, k, nprobe)[0]
+
+
+class IVFEngine:
+    """
+    Owns the snapshot directory: builds snapshots from `video_embedding` and serves the current one.
+
+    Each snapshot lives in its own directory; the `CURRENT` file names the active one and is
+    replaced atomically, so a rebuild (possibly in a background thread or another process)
+    never disturbs searches in flight. Workers notice the new pointer on their next search.
+    A new snapshot keeps its predecessor on disk, so a worker that read the old pointer just
+    before the swap can still open it; a worker that loses the race anyway re-reads the pointer.
+    """
+
+    def __init__(self, snapshot_dir=IVF_SNAPSHOT_DIR):
+        self.snapshot_dir = Path(snapshot_dir)
+        self._lock = threading.Lock()
+        self._index = None
+        self._name = None
+        self._rebuild_thread = None
+        self._rebuild_pending = False
+
+    @property
+    def _pointer(self):
+        return self.snapshot_dir / "CURRENT"
+
+    def _read_pointer(self):
+        try:
+            return self._pointer.read_text().strip()
+        except FileNotFoundError:
+            return None
+
+    def current(self):
+        """The active snapshot, reloaded if `CURRENT` has moved. None when no snapshot exists."""
+        name = self._read_pointer()
+        if name is None:
+            return None
+        with self._lock:
+            while name != self._name:
+                try:
+                    self._index = IVFIndex.load(self.snapshot_dir / name)
+                    self._name = name
+                except FileNotFoundError:
+                    # Removed by a newer build since we read the pointer; follow the pointer
+                    latest = self._read_pointer()
+                    if latest is None or latest == name:
+                        raise
+                    name = latest
+            return self._index
+
+    def build_snapshot(self, nlist=IVF_NLIST):
+        """Build a snapshot of `video_embedding` and make it current. Needs an app context."""
+        # Unique even for back-to-back builds of one process (e.g. coalesced background rebuilds)
+        name = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}-{os.urandom(4).hex()}"
+        staging = self.snapshot_dir / f".{name}.tmp"
+        staging.mkdir(parents=True)
+        try:
+            # Stage the raw vectors on disk through a server-side cursor
+            count = db.session.execute(db.select(db.func.count()).select_from(VideoEmbedding)).scalar()
+            raw_vectors = open_memmap(staging / "raw_vectors.npy", mode="w+", dtype=np.float32, shape=(count, EMBEDDING_DIM))
+            raw_video_ids = np.empty(count, dtype=np.int64)
+            filled = 0
+            result = db.session.execute(
+                db.select(VideoEmbedding.video_id, VideoEmbedding.embedding)
+                .order_by(VideoEmbedding.id)
+                .execution_options(yield_per=10_000)
+            )
+            for rows in result.partitions():
+                rows = rows[:count - filled]  # rows added after the count wait for the next snapshot
+                if not rows:
+                    break
+                raw_video_ids[filled:filled + len(rows)] = [video_id for video_id, _ in rows]
+                raw_vectors[filled:filled + len(rows)] = np.stack([embedding for _, embedding in rows])
+                filled += len(rows)
+            result.close()
+            db.session.rollback()  # end the read transaction before the CPU-heavy part
+
+            if filled:
+                IVFIndex.build(raw_vectors[:filled], raw_video_ids[:filled], staging, nlist or None)
+            del raw_vectors
+            (staging / "raw_vectors.npy").unlink()
+            if not filled:
+                raise ValueError("video_embedding is empty, nothing to index")
+
+            os.replace(staging, self.snapshot_dir / name)
+            previous = self._read_pointer()
+            pointer_tmp = self.snapshot_dir / f".CURRENT.{name}.tmp"
+            pointer_tmp.write_text(name)
+            os.replace(pointer_tmp, self._pointer)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._remove_old_snapshots(keep={name, previous})
+        return name
+
+    def _remove_old_snapshots(self, keep):
+        # Workers still mapping a removed snapshot keep their pages until they swap; unlinking is safe
+        for path in self.snapshot_dir.iterdir():
+            if path.is_dir() and path.name not in keep and not path.name.startswith("."):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def rebuild_in_background(self, app):
+        """
+        Rebuild the snapshot in a daemon thread. Requests made while a build is running are
+        coalesced into one more build once it finishes, so the snapshot catches up with every
+        write that asked for it. Returns whether a new thread was started.
+        """
+        with self._lock:
+            if self._rebuild_thread is not None:
+                self._rebuild_pending = True
+                return False
+
+            def run():
+                while True:
+                    with app.app_context():
+                        try:
+                            self.build_snapshot()
+                        except Exception as e:
+                            app.logger.warning("IVF snapshot rebuild failed: %s", e)
+                    with self._lock:
+                        if not self._rebuild_pending:
+                            self._rebuild_thread = None
+                            return
+                        self._rebuild_pending = False
+
+            self._rebuild_thread = threading.Thread(target=run, name="ivf-rebuild", daemon=True)
+            self._rebuild_thread.start()
+            return True
+
+
+ivf_engine = IVFEngine()
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print(f"Snapshot {ivf_engine.build_snapshot()} is now current in {ivf_engine.snapshot_dir}")
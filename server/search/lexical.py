@@ -0,0 +1,173 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from extensions import db
+from db.models import VideoDescription, TEXT_SEARCH_CONFIG
+
+# ts_rank_cd normalization: 1 divides by 1 + log(document length) so long descriptions do not
+# win by repetition, 32 maps the rank into [0, 1)
+RANK_NORMALIZATION = 1 | 32
+
+# BM25 parameters of the in-memory fallback: term frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Rebuild the fallback index after this many seconds, like the tag index
+LEXICAL_INDEX_MAX_AGE = float(os.getenv("LEXICAL_INDEX_MAX_AGE", "300"))
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their this to was were "
+    "with".split()
+)
+
+
+def tokenize(text):
+    """Lowercased word tokens without stopwords (no stemming, unlike the Postgres configuration)."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory inverted index over `video_description`, ranking with Okapi BM25.
+
+    The fallback for databases without Postgres full-text search (e.g. SQLite in tests).
+    Like `websearch_to_tsquery`, a query matches descriptions containing every term;
+    quoting and operators are not supported. Process-local and rebuilt after `max_age`
+    seconds, with the description endpoints keeping it current in between.
+    """
+
+    def __init__(self, max_age=LEXICAL_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._postings = None  # term -> {description_id: term frequency}
+        self._documents = {}  # description_id -> (video_id, confidence_score, length)
+        self._total_length = 0
+        self._loaded_at = 0.0
+
+    # -------------------------------------------------
+    # Loading
+    # -------------------------------------------------
+    def _load(self):
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._total_length = 0
+        rows = db.session.execute(
+            db.select(
+                VideoDescription.id,
+                VideoDescription.video_id,
+                VideoDescription.confidence_score,
+                VideoDescription.description,
+            ).execution_options(yield_per=10_000)
+        )
+        for description_id, video_id, confidence_score, description in rows:
+            self._index(description_id, video_id, confidence_score, description)
+        self._loaded_at = time.monotonic()
+
+    def _index(self, description_id, video_id, confidence_score, description):
+        terms = Counter(tokenize(description))
+        for term, frequency in terms.items():
+            self._postings[term][description_id] = frequency
+        length = sum(terms.values())
+        self._documents[description_id] = (video_id, confidence_score, length)
+        self._total_length += length
+
+    def ensure_loaded(self):
+        with self._lock:
+            if self._postings is None or time.monotonic() - self._loaded_at > self.max_age:
+                self._load()
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt on next use."""
+        with self._lock:
+            self._postings = None
+
+    # -------------------------------------------------
+    # Writes
+    # -------------------------------------------------
+    def add(self, description):
+        with self._lock:
+            if self._postings is not None:
+                self.remove(description)
+                self._index(description.id, description.video_id, description.confidence_score, description.description)
+
+    def remove(self, description):
+        with self._lock:
+            if self._postings is None or description.id not in self._documents:
+                return
+            for term in set(tokenize(description.description)):
+                self._postings.get(term, {}).pop(description.id, None)
+            self._total_length -= self._documents.pop(description.id)[2]
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def search(self, text, k, min_confidence=0.0):
+        """The k best descriptions as `(description_id, video_id, score)`, best first."""
+        self.ensure_loaded()
+        terms = set(tokenize(text))
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not terms or not all(postings):
+                return []
+
+            # Intersect from the rarest term, which also bounds the number of scored documents
+            postings.sort(key=len)
+            matches = set(postings[0]).intersection(*postings[1:])
+
+            count = len(self._documents)
+            average_length = self._total_length / count or 1
+            idf = [math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+
+            scored = []
+            for description_id in matches:
+                video_id, confidence_score, length = self._documents[description_id]
+                if confidence_score < min_confidence:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                score = sum(
+                    weight * p[description_id] * (BM25_K1 + 1) / (p[description_id] + norm)
+                    for weight, p in zip(idf, postings)
+                )
+                scored.append((description_id, video_id, score))
+            return heapq.nlargest(k, scored, key=lambda hit: (hit[2], -hit[0]))
+
+
+description_index = BM25Index()
+
+
+def _fulltext(text, k, min_confidence):
+    """Postgres full-text search: GIN lookup on `search_vector`, ranked by cover density."""
+    query = db.func.websearch_to_tsquery(db.cast(TEXT_SEARCH_CONFIG, REGCONFIG), text)
+    rank = db.func.ts_rank_cd(VideoDescription.search_vector, query, RANK_NORMALIZATION)
+    rows = db.session.execute(
+        db.select(VideoDescription.id, VideoDescription.video_id, rank.label("score"))
+        .where(VideoDescription.search_vector.bool_op("@@")(query))
+        .where(VideoDescription.confidence_score >= min_confidence)
+        .order_by(rank.desc(), VideoDescription.id)
+        .limit(k)
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def lexical_search(text, k, min_confidence=0.0):
+    """
+    Keyword search over video descriptions with `confidence_score >= min_confidence`.
+
+    On Postgres the matches come from the GIN index on the generated `search_vector` column
+    and are ranked with `ts_rank_cd`, length-normalized in the spirit of BM25 ("fulltext").
+    Other databases use the in-memory BM25 index ("bm25").
+
+    Returns `(hits, strategy)` where hits is a list of `(description_id, video_id, score)`,
+    best first; a video can appear once per matching description.
+    """
+    if db.session.connection().dialect.name == "postgresql":
+        return _fulltext(text, k, min_confidence), "fulltext"
+    return description_index.search(text, k, min_confidence), "bm25"
@@ -0,0 +1,251 @@
+import math
+import os
+
+import numpy as np
+from pgvector.sqlalchemy import Vector, BIT
+from sqlalchemy.dialects import postgresql
+
+from extensions import db
+from db.models import VideoEmbedding, EMBEDDING_DIM, QUANTIZED_SEARCH
+from search.ivf import ivf_engine, IVF_NPROBE
+
+# Filtered searches expected to touch at most this many embedding rows are answered
+# exactly; larger candidate sets go through the HNSW index with post-filtering.
+EXACT_SEARCH_MAX_ROWS = int(os.getenv("EXACT_SEARCH_MAX_ROWS", "50000"))
+
+# hnsw.ef_search bounds (pgvector's default and maximum). An HNSW scan returns at most
+# ef_search rows, so it doubles as the over-fetch size of each ANN round.
+HNSW_EF_SEARCH_MIN = 40
+HNSW_EF_SEARCH_MAX = 1000
+
+# How frame-level distances are combined into one score per video:
+# "max" ranks a video by its best frame, "mean" by the mean of its best `top_m` frames.
+AGGREGATIONS = ("max", "mean")
+DEFAULT_TOP_M = 3
+
+# Quantized search (enabled with QUANTIZED_SEARCH=1) runs the coarse pass on the binary-quantized
+# `embedding_bits` index and reranks RERANK_FACTOR times as many candidates with the
+# full-precision vectors. The coarse pass is itself an HNSW scan bounded by ef_search, so the
+# frames kept after reranking are capped to leave it that headroom.
+RERANK_FACTOR = int(os.getenv("RERANK_FACTOR", "4"))
+QUANTIZED_FETCH_MAX = max(HNSW_EF_SEARCH_MAX // RERANK_FACTOR, 1)
+
+# Engine answering approximate searches: "pgvector" (HNSW in Postgres) or "ivf" (in-process
+# memory-mapped snapshot, see search.ivf). "ivf" falls back to pgvector until a snapshot exists.
+VECTOR_ENGINE = os.getenv("VECTOR_ENGINE", "pgvector")
+# Largest number of frames a single IVF pass returns before giving up on filling k
+IVF_MAX_FETCH = 10_000
+
+
+def _set_ef_search(ef_search):
+    # set_config(..., true) scopes the setting to the current transaction
+    db.session.execute(db.text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(ef_search)})
+
+
+def _embeddings_per_video(total_videos):
+    """Average number of embeddings per video, from the planner's row estimate."""
+    reltuples = db.session.execute(
+        db.text("SELECT reltuples FROM pg_class WHERE oid = 'video_embedding'::regclass")
+    ).scalar()
+    if not reltuples or reltuples < 0 or not total_videos:
+        return 1.0
+    return max(reltuples / total_videos, 1.0)
+
+
+def aggregate_per_video(video_ids, distances, aggregate="max", top_m=DEFAULT_TOP_M):
+    """
+    Combine frame-level hits into one distance per video, vectorized with NumPy.
+    `video_ids` and `distances` are parallel arrays; returns {video_id: distance}.
+    """
+    video_ids = np.asarray(video_ids)
+    distances = np.asarray(distances, dtype=np.float64)
+    if not len(video_ids):
+        return {}
+
+    # Sort by video, then distance, so each video's frames are contiguous and best-first
+    order = np.lexsort((distances, video_ids))
+    video_ids = video_ids[order]
+    distances = distances[order]
+    starts = np.flatnonzero(np.r_[True, video_ids[1:] != video_ids[:-1]])
+
+    if aggregate == "mean":
+        group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(video_ids)]))
+        rank = np.arange(len(video_ids)) - starts[group]
+        keep = rank < top_m
+        scores = np.bincount(group[keep], weights=distances[keep]) / np.bincount(group[keep])
+    else:
+        scores = distances[starts]
+    return dict(zip(video_ids[starts].tolist(), scores.tolist()))
+
+
+def _exact(query_vector, k, candidates, aggregate="max", top_m=DEFAULT_TOP_M):
+    """
+    Exact per-video distance over the candidates' embeddings, aggregated in SQL.
+    The candidates are bound as one array parameter (video_id = ANY(:candidate_ids)) rather
+    than an IN list, so the statement stays the same size however many there are.
+    """
+    frame_distance = VideoEmbedding.embedding.cosine_distance(query_vector)
+    candidate_ids = db.bindparam("candidate_ids", list(candidates), type_=postgresql.ARRAY(db.Integer))
+    frames = (
+        db.select(
+            VideoEmbedding.video_id,
+            frame_distance.label("distance"),
+            db.func.row_number().over(
+                partition_by=VideoEmbedding.video_id, order_by=frame_distance
+            ).label("frame_rank"),
+        )
+        .where(VideoEmbedding.video_id == db.any_(candidate_ids))
+        .subquery()
+    )
+    if aggregate == "mean":
+        distance = db.func.avg(frames.c.distance)
+        stmt = db.select(frames.c.video_id, distance.label("distance")).where(frames.c.frame_rank <= top_m)
+    else:
+        distance = db.func.min(frames.c.distance)
+        stmt = db.select(frames.c.video_id, distance.label("distance"))
+    # Grouping keeps the planner off the ANN index, so every candidate frame is scored
+    rows = db.session.execute(
+        stmt.group_by(frames.c.video_id).order_by(distance).limit(k)
+    ).all()
+    return dict(rows)
+
+
+def _nearest_frames(query_vector, limit, quantized):
+    """
+    The `limit` nearest frames as an ANN query. When `quantized`, the coarse pass orders by
+    Hamming distance on `embedding_bits` and the candidates are reranked by exact cosine distance;
+    `limit` must then be at most QUANTIZED_FETCH_MAX.
+    """
+    if not quantized:
+        distance = VideoEmbedding.embedding.cosine_distance(query_vector)
+        return db.select(VideoEmbedding.video_id, distance.label("distance")).order_by(distance).limit(limit)
+
+    query_bits = db.cast(
+        db.func.binary_quantize(db.bindparam("query_vector", query_vector, type_=Vector(EMBEDDING_DIM))),
+        BIT(EMBEDDING_DIM),
+    )
+    coarse = (
+        db.select(VideoEmbedding.video_id, VideoEmbedding.embedding)
+        .order_by(VideoEmbedding.embedding_bits.hamming_distance(query_bits))
+        .limit(limit * RERANK_FACTOR)
+        .subquery()
+    )
+    distance = coarse.c.embedding.cosine_distance(query_vector)
+    return db.select(coarse.c.video_id, distance.label("distance")).order_by(distance).limit(limit)
+
+
+def _ann(query_vector, k, candidates=None, ef_search=HNSW_EF_SEARCH_MIN, aggregate="max", top_m=DEFAULT_TOP_M,
+         quantized=False):
+    """
+    HNSW search with post-filtering and per-video aggregation. Rather than over-fetching
+    by a fixed factor, it starts from the caller's estimate and doubles ef_search until k
+    distinct videos are found, the index runs out of rows, or ef_search hits its maximum.
+    Returns `(distance per video, whether k were found)`.
+    """
+    max_fetch = QUANTIZED_FETCH_MAX if quantized else HNSW_EF_SEARCH_MAX
+    ef_search = min(max(ef_search, k, HNSW_EF_SEARCH_MIN), max_fetch)
+    while True:
+        # The quantized coarse pass must return every candidate that will be reranked
+        _set_ef_search(ef_search * RERANK_FACTOR if quantized else ef_search)
+        rows = db.session.execute(_nearest_frames(query_vector, ef_search, quantized)).all()
+
+        if candidates is not None:
+            hits = [(video_id, dist) for video_id, dist in rows if video_id in candidates]
+        else:
+            hits = rows
+        best = aggregate_per_video(
+            [video_id for video_id, _ in hits], [dist for _, dist in hits], aggregate, top_m
+        )
+
+        if len(best) >= k or len(rows) < ef_search or ef_search >= max_fetch:
+            return best, len(best) >= k
+        ef_search = min(ef_search * 2, max_fetch)
+
+
+def _ivf(index, query_vector, k, candidates=None, fetch=HNSW_EF_SEARCH_MIN, aggregate="max", top_m=DEFAULT_TOP_M):
+    """
+    Same contract as `_ann`, answered from the in-process IVF snapshot with no database
+    round trip. Widens both the number of frames fetched and the lists probed until k
+    distinct videos are found or every list has been scanned.
+    """
+    fetch = min(max(fetch, k), IVF_MAX_FETCH)
+    nprobe = IVF_NPROBE
+    while True:
+        video_ids, distances = index.search(query_vector, fetch, nprobe)
+        exhausted = nprobe >= index.nlist and len(video_ids) < fetch
+        if candidates is not None:
+            keep = np.fromiter((video_id in candidates for video_id in video_ids.tolist()), dtype=bool, count=len(video_ids))
+            video_ids, distances = video_ids[keep], distances[keep]
+        best = aggregate_per_video(video_ids, distances, aggregate, top_m)
+
+        if len(best) >= k or exhausted or fetch >= IVF_MAX_FETCH:
+            return best, len(best) >= k
+        fetch = min(fetch * 2, IVF_MAX_FETCH)
+        nprobe = min(nprobe * 2, index.nlist)
+
+
+def _approximate(index, query_vector, k, candidates, fetch, aggregate, top_m, quantized):
+    """
+    Route an approximate search to the IVF `index` if given, else pgvector. Returns `(best, filled, engine)`.
+
+    An approximate pass only sees the frames it happened to fetch, so with "mean" a video with
+    a single fetched frame would score as well as its best frame. The videos it finds are
+    therefore rescored exactly over their best `top_m` frames.
+    """
+    if index is not None:
+        best, filled = _ivf(index, query_vector, k, candidates, fetch, aggregate, top_m)
+        engine = "ivf"
+    else:
+        best, filled = _ann(query_vector, k, candidates, fetch, aggregate, top_m, quantized)
+        engine = "quantized-ann" if quantized else "ann"
+    if aggregate == "mean" and best:
+        best = _exact(query_vector, len(best), best.keys(), aggregate, top_m)
+    return best, filled, engine
+
+
+def semantic_search(query_vector, k, candidates=None, total_videos=None, aggregate="max", top_m=DEFAULT_TOP_M,
+                    quantized=QUANTIZED_SEARCH):
+    """
+    The k nearest distinct videos to `query_vector` by cosine similarity, best first.
+
+    Videos have one embedding per frame, so frame hits are combined per video with
+    `aggregate` ("max": best frame, "mean": mean of the best `top_m` frames).
+
+    `candidates` optionally restricts results to a set of video ids (e.g. a tag filter
+    result) and `total_videos` is the catalog size used to estimate its selectivity:
+    - small candidate sets are ranked exactly over just their embeddings ("exact")
+    - large ones use the HNSW index (`ix_video_embedding_hnsw_cos`) with post-filtering,
+      starting ef_search at the size the selectivity predicts and widening it ("ann")
+    - if the widest ANN pass still cannot fill k, exact search finishes the job ("ann+exact")
+
+    With `quantized`, ANN passes search the binary-quantized index and rerank with the
+    full-precision vectors, trading a little recall for a much smaller index. With
+    VECTOR_ENGINE=ivf, approximate passes use the in-process IVF snapshot instead ("ivf").
+
+    Returns `(hits, strategy)` where hits is a list of `(video_id, score)`, score being the
+    cosine similarity.
+    """
+    index = ivf_engine.current() if VECTOR_ENGINE == "ivf" else None
+    if index is not None:
+        per_video = max(len(index) / total_videos, 1.0) if total_videos else 1.0
+    else:
+        per_video = _embeddings_per_video(total_videos)
+
+    if candidates is None:
+        fetch = math.ceil(k * per_video * (top_m if aggregate == "mean" else 1))
+        best, _, strategy = _approximate(index, query_vector, k, None, fetch, aggregate, top_m, quantized)
+    elif not candidates:
+        return [], "empty"
+    elif len(candidates) * per_video <= EXACT_SEARCH_MAX_ROWS:
+        best = _exact(query_vector, k, candidates, aggregate, top_m)
+        strategy = "exact"
+    else:
+        selectivity = len(candidates) / max(total_videos or len(candidates), len(candidates))
+        fetch = math.ceil(k * per_video / selectivity)
+        best, filled, strategy = _approximate(index, query_vector, k, candidates, fetch, aggregate, top_m, quantized)
+        if not filled:
+            best = _exact(query_vector, k, candidates, aggregate, top_m)
+            strategy += "+exact"
+
+    ranked = sorted(best.items(), key=lambda item: item[1])[:k]
+    return [(video_id, 1.0 - dist) for video_id, dist in ranked], strategy
@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+from pyroaring import BitMap
+
+from extensions import db
+from db.models import Video, PropertyValue, VideoPropertyValue
+
+# Rebuild the index from the database after this many seconds, so tags written by
+# other processes (other workers, the ingest pipeline) become visible eventually.
+TAG_INDEX_MAX_AGE = float(os.getenv("TAG_INDEX_MAX_AGE", "300"))
+
+# Summed confidences are ranked and paged as integers in units of 1/CONFIDENCE_SCALE: a float
+# sum depends on the order it was added up in, so it cannot be compared for equality reliably
+CONFIDENCE_SCALE = 1_000_000
+
+
+class TagIndex:
+    """
+    In-memory posting lists for tag filtering.
+
+    Holds one compressed (roaring) bitmap of video ids per property value, built from
+    `video_property_value`. Filtering is AND across properties and OR within a property,
+    which becomes a handful of bitmap unions and intersections instead of a multi-way join.
+
+    The index is process-local: it is built lazily on first use, kept current by the
+    write endpoints running in this process, and rebuilt after `TAG_INDEX_MAX_AGE` seconds.
+    """
+
+    def __init__(self, max_age=TAG_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._postings = None  # property_value_id -> BitMap of video ids
+        self._property_of = {}  # property_value_id -> property_id
+        self._videos = BitMap()  # every video id
+        self._loaded_at = 0.0
+
+    # -------------------------------------------------
+    # Loading
+    # -------------------------------------------------
+    def _load(self):
+        property_of = dict(db.session.execute(db.select(PropertyValue.id, PropertyValue.property_id)).all())
+
+        video_ids = defaultdict(list)
+        rows = db.session.execute(
+            db.select(VideoPropertyValue.property_value_id, VideoPropertyValue.video_id)
+            .execution_options(yield_per=50_000)
+        )
+        for property_value_id, video_id in rows:
+            video_ids[property_value_id].append(video_id)
+
+        self._postings = {pv_id: BitMap(ids) for pv_id, ids in video_ids.items()}
+        self._property_of = property_of
+        self._videos = BitMap(db.session.execute(db.select(Video.id)).scalars())
+        self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        with self._lock:
+            if self._postings is None or time.monotonic() - self._loaded_at > self.max_age:
+                self._load()
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt on next use."""
+        with self._lock:
+            self._postings = None
+
+    # -------------------------------------------------
+    # Writes
+    # -------------------------------------------------
+    def add_video(self, video_id):
+        with self._lock:
+            if self._postings is not None:
+                self._videos.add(video_id)
+
+    def remove_video(self, video_id):
+        with self._lock:
+            if self._postings is None:
+                return
+            self._videos.discard(video_id)
+            for postings in self._postings.values():
+                postings.discard(video_id)
+
+    def add_value(self, property_value_id, property_id):
+        with self._lock:
+            if self._postings is not None:
+                self._property_of[property_value_id] = property_id
+
+    def add(self, video_id, property_value_id):
+        with self._lock:
+            if self._postings is None:
+                return
+            self._postings.setdefault(property_value_id, BitMap()).add(video_id)
+            self._videos.add(video_id)
+
+    def remove(self, video_id, property_value_id):
+        with self._lock:
+            if self._postings is not None and property_value_id in self._postings:
+                self._postings[property_value_id].discard(video_id)
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def unknown_values(self, property_value_ids):
+        """Return the ids that are not existing property values."""
+        self.ensure_loaded()
+        with self._lock:
+            return [pv_id for pv_id in property_value_ids if pv_id not in self._property_of]
+
+    def video_count(self):
+        """Number of videos in the catalog."""
+        self.ensure_loaded()
+        with self._lock:
+            return len(self._videos)
+
+    def _group_by_property(self, property_value_ids):
+        groups = defaultdict(list)
+        for pv_id in property_value_ids:
+            groups[self._property_of.get(pv_id)].append(pv_id)
+        return groups
+
+    def _union(self, property_value_ids, overrides=None):
+        overrides = overrides or {}
+        return BitMap().union(*(
+            overrides[pv_id] if pv_id in overrides else self._postings.get(pv_id, BitMap())
+            for pv_id in property_value_ids
+        ))
+
+    def _intersect(self, bitmaps):
+        # Intersect smallest first so the running result shrinks as fast as possible
+        result = None
+        for bitmap in sorted(bitmaps, key=len):
+            result = bitmap.copy() if result is None else result & bitmap
+            if not result:
+                break
+        return self._videos.copy() if result is None else result
+
+    def match(self, property_value_ids, min_confidence=None):
+        """
+        Video ids matching the selection: OR within a property, AND across properties.
+        An empty selection matches every video. `min_confidence` optionally maps value ids
+        to the lowest confidence_score a tag needs to count.
+        """
+        self.ensure_loaded()
+        overrides = confident_postings(min_confidence)
+        with self._lock:
+            groups = self._group_by_property(property_value_ids)
+            return self._intersect([self._union(ids, overrides) for ids in groups.values()])
+
+    def facet_counts(self, property_value_ids, min_confidence=None):
+        """
+        Match count for every property value under the selection, in one pass.
+
+        Counting is disjunctive: a value is intersected with the selection on every other
+        property, so selecting a value does not zero out the counts of its siblings.
+        Confidence thresholds (see `match`) apply to the selection, not to the counts.
+        Returns `(counts, total)` where `counts` maps property_value_id -> count and
+        `total` is the number of videos matching the full selection.
+        """
+        self.ensure_loaded()
+        overrides = confident_postings(min_confidence)
+        with self._lock:
+            unions = {
+                property_id: self._union(ids, overrides)
+                for property_id, ids in self._group_by_property(property_value_ids).items()
+            }
+            full = self._intersect(list(unions.values()))
+            base_for = {
+                property_id: self._intersect([u for p, u in unions.items() if p != property_id])
+                for property_id in unions
+            }
+
+            counts = {}
+            for pv_id, property_id in self._property_of.items():
+                postings = self._postings.get(pv_id)
+                base = base_for.get(property_id, full)
+                counts[pv_id] = base.intersection_cardinality(postings) if postings else 0
+            return counts, len(full)
+
+    def rank_by_confidence(self, property_value_ids, min_confidence=None, limit=None, after=None):
+        """
+        One page of the videos matching the selection (as in `match`), ordered by aggregate
+        confidence: the sum of the confidence_score of their tags among the selected values,
+        ties broken by id. `after` is the `(score, video_id)` of the last row of the previous
+        page. Returns up to `limit` `(video_id, score)` pairs, best first.
+
+        Runs as a keyset query, so a page costs `limit` rows rather than every match. A single
+        value walks `ix_video_property_value_property_value_id_confidence` from the cursor;
+        several values are summed per video, with AND across properties as a HAVING clause.
+        Sums are rounded to 1/CONFIDENCE_SCALE and compared as integers.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            groups = list(self._group_by_property(property_value_ids).values())
+
+        video_id = VideoPropertyValue.video_id
+        confidence = VideoPropertyValue.confidence_score
+        if len(property_value_ids) == 1:
+            score = confidence
+            stmt = db.select(video_id, score).where(_tag_condition(property_value_ids, min_confidence))
+            if after is not None:
+                # The first condition bounds the index range; the second skips ties up to the cursor
+                stmt = stmt.where(confidence <= after[0], db.or_(confidence < after[0], video_id > after[1]))
+        else:
+            score = db.cast(db.func.round(db.func.sum(confidence) * CONFIDENCE_SCALE), db.BigInteger)
+            group_of = {pv_id: group for group, ids in enumerate(groups) for pv_id in ids}
+            matched_groups = db.func.count(db.distinct(db.case(group_of, value=VideoPropertyValue.property_value_id)))
+            stmt = (
+                db.select(video_id, score)
+                .where(_tag_condition(property_value_ids, min_confidence))
+                .group_by(video_id)
+                .having(matched_groups == len(groups))
+            )
+            if after is not None:
+                last_score = round(after[0] * CONFIDENCE_SCALE)
+                stmt = stmt.having(db.or_(score < last_score, db.and_(score == last_score, video_id > after[1])))
+
+        stmt = stmt.order_by(score.desc(), video_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        rows = db.session.execute(stmt).all()
+        if len(property_value_ids) == 1:
+            return [(video_id, float(total)) for video_id, total in rows]
+        return [(video_id, total / CONFIDENCE_SCALE) for video_id, total in rows]
+
+
+def _tag_condition(property_value_ids, min_confidence):
+    """WHERE clause selecting the tags of the given values, honoring per-value thresholds."""
+    min_confidence = min_confidence or {}
+    plain = [pv_id for pv_id in property_value_ids if pv_id not in min_confidence]
+    conditions = [
+        db.and_(
+            VideoPropertyValue.property_value_id == pv_id,
+            VideoPropertyValue.confidence_score >= threshold,
+        )
+        for pv_id, threshold in min_confidence.items()
+    ]
+    if plain:
+        conditions.append(VideoPropertyValue.property_value_id.in_(plain))
+    return db.or_(*conditions)
+
+
+def confident_postings(min_confidence):
+    """
+    Bitmaps of the videos tagged with each value at or above its threshold.
+
+    The in-memory postings ignore confidence, so these come from the database in one query;
+    `ix_video_property_value_property_value_id_confidence` answers it with index-only scans.
+    """
+    if not min_confidence:
+        return {}
+    video_ids = defaultdict(list)
+    rows = db.session.execute(
+        db.select(VideoPropertyValue.property_value_id, VideoPropertyValue.video_id)
+        .where(_tag_condition(min_confidence, min_confidence))
+    )
+    for property_value_id, video_id in rows:
+        video_ids[property_value_id].append(video_id)
+    return {pv_id: BitMap(video_ids.get(pv_id, ())) for pv_id in min_confidence}
+
+
+tag_index = TagIndex()
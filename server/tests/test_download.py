@@ -0,0 +1,125 @@
+"""
+Tests for the download stage of the video pipeline, against a local HTTP server.
+Run from the server directory with: python3 -m pytest tests
+"""
+
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the server directory to the Python path so we can import from it
+current_dir = Path(__file__).resolve().parent
+server_dir = current_dir.parent
+if str(server_dir) not in sys.path:
+    sys.path.insert(0, str(server_dir))
+
+from video_pipeline.download import Downloader
+
+BODY = b"\x00\x01video bytes" * 1000
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves BODY on any path, with behaviour chosen by the path:
+    /slow/... answers after a delay, /flaky/N/... fails with 503 N times first,
+    /missing/... is a 404 and /down/... always fails with 503.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests[self.path] += 1
+            attempt = server.requests[self.path]
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            parts = self.path.strip("/").split("/")
+            if parts[0] == "slow":
+                time.sleep(0.2)
+            if parts[0] == "missing":
+                self.send_error(404)
+            elif parts[0] == "down" or (parts[0] == "flaky" and attempt <= int(parts[1])):
+                self.send_error(503)
+            else:
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(BODY)))
+                self.end_headers()
+                self.wfile.write(BODY)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DownloaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = Counter()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out_dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def download(self, downloader, path):
+        output = self.out_dir / path.strip("/").replace("/", "_")
+        return downloader.download(self.base_url + path, str(output)), output
+
+    def test_download_writes_body(self):
+        ok, output = self.download(Downloader(), "/ok/video.mp4")
+        self.assertTrue(ok)
+        self.assertEqual(output.read_bytes(), BODY)
+
+    def test_transient_errors_are_retried(self):
+        downloader = Downloader(retries=3, backoff=0.01)
+        ok, output = self.download(downloader, "/flaky/2/video.mp4")
+        self.assertTrue(ok)
+        self.assertEqual(output.read_bytes(), BODY)
+        self.assertEqual(self.server.requests["/flaky/2/video.mp4"], 3)
+
+    def test_gives_up_after_retries(self):
+        downloader = Downloader(retries=2, backoff=0.01)
+        ok, _ = self.download(downloader, "/down/video.mp4")
+        self.assertFalse(ok)
+        self.assertEqual(self.server.requests["/down/video.mp4"], 3)
+
+    def test_client_errors_are_not_retried(self):
+        downloader = Downloader(retries=3, backoff=0.01)
+        ok, _ = self.download(downloader, "/missing/video.mp4")
+        self.assertFalse(ok)
+        self.assertEqual(self.server.requests["/missing/video.mp4"], 1)
+
+    def test_per_host_limit(self):
+        downloader = Downloader(workers=8, per_host=2)
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(self.download(downloader, f"/slow/{i}.mp4")[0]))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [True] * 8)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
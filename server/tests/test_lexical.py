@@ -0,0 +1,127 @@
+"""
+Tests for keyword search over video descriptions on SQLite, where it is answered by the
+in-memory BM25 index. Run from the server directory with: python3 -m pytest tests
+"""
+
+import os
+import sys
+import unittest
+from pathlib import Path
+
+# Add the server directory to the Python path so we can import from it
+current_dir = Path(__file__).resolve().parent
+server_dir = current_dir.parent
+if str(server_dir) not in sys.path:
+    sys.path.insert(0, str(server_dir))
+
+os.environ["DATABASE_URL"] = "sqlite://"
+
+from app import create_app
+from extensions import db
+from db.models import Video, VideoDescription
+from search.lexical import BM25Index, description_index, lexical_search
+
+DESCRIPTIONS = [
+    # (video, description, confidence_score)
+    (0, "A red car drives along the coast", 0.9),
+    (0, "Waves break on the coast at sunset", 0.8),
+    (1, "A red car parked in a street with many other cars, bikes, buses and people walking by", 0.7),
+    (1, "A dog runs after a ball in the park", 0.2),
+    (2, "A red bicycle leans against a wall", 0.6),
+]
+
+
+class LexicalSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        videos = [Video(name=f"video{i}", path=f"/videos/video{i}.mp4") for i in range(3)]
+        db.session.add_all(videos)
+        db.session.flush()
+        self.descriptions = [
+            VideoDescription(video_id=videos[video].id, description=description, confidence_score=confidence_score)
+            for video, description, confidence_score in DESCRIPTIONS
+        ]
+        db.session.add_all(self.descriptions)
+        db.session.commit()
+        self.video_ids = [video.id for video in videos]
+
+        description_index.invalidate()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+        description_index.invalidate()
+
+    def search(self, **params):
+        response = self.client.get("/video-descriptions/search", query_string=params)
+        return response, response.get_json()
+
+    def test_uses_bm25_outside_postgres(self):
+        hits, strategy = lexical_search("red car", 10)
+        self.assertEqual(strategy, "bm25")
+        self.assertEqual({description_id for description_id, _, _ in hits}, {self.descriptions[0].id, self.descriptions[2].id})
+
+    def test_every_term_must_match(self):
+        _, results = self.search(q="red car")
+        self.assertEqual(len(results), 2)
+        self.assertNotIn(self.descriptions[4].id, [result["id"] for result in results])
+
+        _, results = self.search(q="red submarine")
+        self.assertEqual(results, [])
+
+    def test_shorter_description_ranks_first(self):
+        response, results = self.search(q="Red CAR")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Search-Strategy"], "bm25")
+        self.assertEqual([result["id"] for result in results], [self.descriptions[0].id, self.descriptions[2].id])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        self.assertEqual(results[0]["video_id"], self.video_ids[0])
+        self.assertEqual(results[0]["confidence_score"], 0.9)
+
+    def test_min_confidence_and_k(self):
+        _, results = self.search(q="red", min_confidence=0.65)
+        self.assertEqual([result["id"] for result in results], [self.descriptions[0].id, self.descriptions[2].id])
+
+        _, results = self.search(q="red", k=1)
+        self.assertEqual(len(results), 1)
+
+    def test_stopwords_only_match_nothing(self):
+        _, results = self.search(q="the a of")
+        self.assertEqual(results, [])
+
+    def test_invalid_queries_are_rejected(self):
+        self.assertEqual(self.search(q="  ")[0].status_code, 400)
+        self.assertEqual(self.search(q="car", min_confidence=1.5)[0].status_code, 400)
+
+    def test_writes_update_the_loaded_index(self):
+        self.assertEqual(self.search(q="giraffe")[1], [])
+
+        response = self.client.post(
+            "/video-descriptions",
+            json={"video_id": self.video_ids[2], "description": "A giraffe eats leaves", "confidence_score": 0.5},
+        )
+        description_id = response.get_json()["id"]
+        _, results = self.search(q="giraffe")
+        self.assertEqual([result["id"] for result in results], [description_id])
+
+        self.client.delete(f"/video-descriptions/{description_id}")
+        self.assertEqual(self.search(q="giraffe")[1], [])
+
+    def test_index_is_rebuilt_when_stale(self):
+        index = BM25Index(max_age=0)
+        self.assertEqual(len(index.search("coast", 10)), 2)
+
+        db.session.add(VideoDescription(video_id=self.video_ids[2], description="Surfers on the coast", confidence_score=0.5))
+        db.session.commit()
+        self.assertEqual(len(index.search("coast", 10)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Download stage of the video pipeline.
+
+Videos are fetched by a pool of worker threads sharing one `requests.Session`, so
+connections to the same host are kept alive and reused. Concurrency is bounded overall
+(the number of workers) and per host, and transient failures (connection errors,
+timeouts, 429 and 5xx responses) are retried with exponential backoff.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))       # concurrent downloads
+DOWNLOAD_PER_HOST = int(os.getenv("DOWNLOAD_PER_HOST", "4"))     # concurrent downloads per host
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))       # retries after the first attempt
+DOWNLOAD_BACKOFF = float(os.getenv("DOWNLOAD_BACKOFF", "1.0"))   # seconds before the first retry, doubled after
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "30"))    # connect/read timeout in seconds
+CHUNK_SIZE = 1024 * 1024
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Use browser-like headers to avoid bot detection
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def is_retryable(error: requests.exceptions.RequestException) -> bool:
+    """Whether a failed request is worth retrying."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class Downloader:
+    """Thread-safe downloader shared by the workers of the download stage."""
+
+    def __init__(self, workers: int = DOWNLOAD_WORKERS, per_host: int = DOWNLOAD_PER_HOST,
+                 retries: int = DOWNLOAD_RETRIES, backoff: float = DOWNLOAD_BACKOFF,
+                 timeout: float = DOWNLOAD_TIMEOUT):
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+        self._lock = threading.Lock()
+
+    def host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Semaphore bounding the concurrent requests to the host of `url`."""
+        with self._lock:
+            return self._host_slots[urlsplit(url).netloc]
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Full jitter keeps retries of many failed downloads from arriving in lockstep
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def download(self, url: str, output_path: str) -> bool:
+        """Download `url` to `output_path`, retrying transient failures. Returns success."""
+        for attempt in range(self.retries + 1):
+            try:
+                with self.host_slot(url):
+                    with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                        response.raise_for_status()
+                        with open(output_path, 'wb') as f:
+                            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                                f.write(chunk)
+            except requests.exceptions.RequestException as e:
+                if attempt == self.retries or not is_retryable(e):
+                    print(f"  Request error downloading {url}: {e}")
+                    return False
+                delay = self._retry_delay(attempt)
+                print(f"  Retrying {url} in {delay:.1f}s ({e})")
+                time.sleep(delay)
+                continue
+
+            # Verify file was downloaded and has content
+            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                print(f"  Downloaded {url} ({os.path.getsize(output_path)} bytes)")
+                return True
+            print(f"  Download failed: {url} is empty")
+            return False
+        return False
+
+    @contextmanager
+    def stream(self, url: str):
+        """
+        Open `url` for streaming, retrying transient failures until the response starts.
+        Yields the response while holding the host slot; failures once the body is being read
+        are not retried, since its consumer has already seen part of it.
+        """
+        for attempt in range(self.retries + 1):
+            slot = self.host_slot(url)
+            slot.acquire()
+            response = None
+            try:
+                response = self.session.get(url, stream=True, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                if response is not None:
+                    response.close()
+                slot.release()
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                delay = self._retry_delay(attempt)
+                print(f"  Retrying {url} in {delay:.1f}s ({e})")
+                time.sleep(delay)
+                continue
+
+            try:
+                with response:
+                    yield response
+            finally:
+                slot.release()
+            return
@@ -0,0 +1,114 @@
+"""
+Persistent record of the pipeline's progress, so reruns are incremental.
+
+One row per source URL stores the SHA-256 of the downloaded content and when each stage
+(download, convert, register) last completed. A rerun skips videos that are finished,
+resumes those that stopped half-way, and reuses the WebP of any earlier video with the
+same content instead of transcoding it again.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    url TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    content_hash TEXT,
+    webp_path TEXT,
+    video_id INTEGER,
+    downloaded_at REAL,
+    converted_at REAL,
+    registered_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_videos_content_hash ON videos (content_hash);
+"""
+
+
+class Manifest:
+    """
+    SQLite-backed manifest, safe to share between the pipeline's worker threads.
+    Every update is committed immediately, so an interrupted run loses at most the
+    videos that were in flight.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def get(self, url: str) -> Optional[sqlite3.Row]:
+        rows = self._execute("SELECT * FROM videos WHERE url = ?", (url,))
+        return rows[0] if rows else None
+
+    def converted_with_hash(self, content_hash: str) -> Optional[str]:
+        """WebP path of an earlier conversion of the same content whose file still exists."""
+        rows = self._execute(
+            "SELECT webp_path FROM videos WHERE content_hash = ? AND converted_at IS NOT NULL",
+            (content_hash,),
+        )
+        return next((row["webp_path"] for row in rows if row["webp_path"] and Path(row["webp_path"]).exists()), None)
+
+    def counts(self) -> dict:
+        row = self._execute(
+            "SELECT count(*) AS total, count(downloaded_at) AS downloaded, count(converted_at) AS converted, "
+            "count(registered_at) AS registered FROM videos"
+        )[0]
+        return dict(row)
+
+    # -------------------------------------------------
+    # Writes
+    # -------------------------------------------------
+    def start(self, url: str, name: str) -> None:
+        """Record an attempt at `url`, creating its row on first sight."""
+        self._execute(
+            "INSERT INTO videos (url, name, attempts) VALUES (?, ?, 1) "
+            "ON CONFLICT (url) DO UPDATE SET name = excluded.name, attempts = attempts + 1, error = NULL",
+            (url, name),
+        )
+
+    def mark_downloaded(self, url: str, content_hash: str) -> None:
+        # New content invalidates an earlier conversion of this URL
+        self._execute(
+            "UPDATE videos SET converted_at = CASE WHEN content_hash IS ? THEN converted_at END, "
+            "content_hash = ?, downloaded_at = ? WHERE url = ?",
+            (content_hash, content_hash, time.time(), url),
+        )
+
+    def mark_converted(self, url: str, webp_path: str) -> None:
+        self._execute(
+            "UPDATE videos SET webp_path = ?, converted_at = ? WHERE url = ?",
+            (webp_path, time.time(), url),
+        )
+
+    def mark_registered(self, url: str, video_id: int) -> None:
+        self._execute(
+            "UPDATE videos SET video_id = ?, registered_at = ? WHERE url = ?",
+            (video_id, time.time(), url),
+        )
+
+    def mark_failed(self, url: str, error: str) -> None:
+        self._execute("UPDATE videos SET error = ? WHERE url = ?", (error, url))
+
+    def clear(self) -> None:
+        self._execute("DELETE FROM videos")
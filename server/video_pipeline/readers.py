@@ -0,0 +1,138 @@
+"""
+Streaming readers for the pipeline's input manifest.
+
+Each reader yields the entries (dicts with video_name and video_url) one at a time while
+reading the file in chunks, so memory use does not grow with the number of entries.
+Supported formats are a JSON array (videos.json), newline-delimited JSON and CSV with a
+header row.
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+READ_SIZE = 64 * 1024  # characters read from the file at a time
+MAX_ENTRY_SIZE = 1024 * 1024  # characters buffered for one entry before giving up on it
+
+FORMATS = ("json", "ndjson", "csv")
+SUFFIX_FORMATS = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _Buffer:
+    """Window over a text file that is refilled on demand and dropped once consumed."""
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+        self.offset = 0  # characters dropped from the front, for error positions
+
+    def fill(self) -> bool:
+        """Read another chunk, dropping what has been consumed. False (and no change) at end of file."""
+        chunk = "" if self.eof else self.f.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Next non-whitespace character, without consuming it. None at end of file."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return None
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char is None or char not in chars:
+            found = repr(char) if char else "end of file"
+            raise ValueError(f"expected one of {chars!r} at character {self.offset + self.pos}, found {found}")
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        """Decode the JSON value at the current position, reading more of the file as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as e:
+                # More input can only help while the entry may still be incomplete
+                if len(self.text) - self.pos <= MAX_ENTRY_SIZE and self.fill():
+                    continue
+                raise ValueError(f"invalid JSON at character {self.offset + e.pos}: {e.msg}") from None
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(f: TextIO) -> Iterator[Any]:
+    """Yield the elements of the JSON array in `f` one at a time."""
+    buffer = _Buffer(f)
+    buffer.expect("[")
+    if buffer.peek() == "]":
+        buffer.pos += 1
+    else:
+        while True:
+            yield buffer.decode()
+            if buffer.expect(",]") == "]":
+                break
+    if buffer.peek() is not None:
+        raise ValueError(f"unexpected data after the JSON array at character {buffer.offset + buffer.pos}")
+
+
+def iter_ndjson(f: TextIO) -> Iterator[Any]:
+    """Yield the value on each non-blank line of `f`."""
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON on line {line_number}: {e.msg}") from None
+
+
+def iter_csv(f: TextIO) -> Iterator[Dict[str, str]]:
+    """Yield a dict per row of `f`, keyed by the header row (video_name, video_url, ...)."""
+    reader = csv.DictReader(f)
+    missing = {"video_name", "video_url"} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV header is missing {', '.join(sorted(missing))}")
+    for row in reader:
+        yield row
+
+
+READERS = {"json": iter_json_array, "ndjson": iter_ndjson, "csv": iter_csv}
+
+
+def detect_format(path: Path) -> str:
+    """Input format from the file suffix, defaulting to a JSON array."""
+    return SUFFIX_FORMATS.get(Path(path).suffix.lower(), "json")
+
+
+def read_videos(path: Path, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield the video entries of `path`. `fmt` is one of FORMATS and is detected from
+    the suffix when omitted. Raises ValueError for malformed input, once it is reached.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in READERS:
+        raise ValueError(f"unknown input format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    with open(path, "r", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+        for entry in READERS[fmt](f):
+            if not isinstance(entry, dict):
+                raise ValueError(f"expected an object per video, got {type(entry).__name__}")
+            yield entry
@@ -0,0 +1,101 @@
+"""
+Plumbing for the video pipeline: jobs flow through stages of worker threads connected by
+bounded queues, so a slow stage applies backpressure instead of letting work pile up in memory.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+QUEUE_SIZE = 16  # jobs buffered between two stages
+
+# Marks the end of a queue's items
+DONE = object()
+
+
+@dataclass
+class VideoJob:
+    """One entry of videos.json on its way through the pipeline."""
+    index: int
+    name: str
+    url: str
+    temp_path: Path
+    webp_path: Path
+    downloaded: bool = False
+    converted: bool = False
+    source_bytes: int = 0
+    content_hash: Optional[str] = None  # SHA-256 of the source video
+    error: Optional[str] = None
+    timings: dict = field(default_factory=dict)  # stage -> seconds
+
+
+def feed(items: Iterable[Any], out_queue: queue.Queue) -> threading.Thread:
+    """
+    Put `items` on `out_queue` from a background thread, then DONE. `items` may be a lazy
+    iterator; the bounded queue keeps it from being read further ahead than the stages.
+    """
+    def run():
+        try:
+            for item in items:
+                out_queue.put(item)
+        finally:
+            out_queue.put(DONE)  # even if `items` raised, so the stages still finish
+
+    thread = threading.Thread(target=run, name="feed", daemon=True)
+    thread.start()
+    return thread
+
+
+def drain(in_queue: queue.Queue) -> Iterator[Any]:
+    """Yield items from `in_queue` until DONE."""
+    while True:
+        item = in_queue.get()
+        if item is DONE:
+            return
+        yield item
+
+
+class Stage:
+    """
+    `workers` threads applying `fn` to the jobs of `in_queue` and passing them on to `out_queue`.
+
+    `fn` updates the job in place. A job whose `fn` raises is passed on with `error` set,
+    so later stages and the final report still see it. The stage puts DONE on `out_queue`
+    once every worker has finished.
+    """
+
+    def __init__(self, name: str, fn: Callable[[VideoJob], None], workers: int,
+                 in_queue: queue.Queue, out_queue: queue.Queue):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self._running = self.workers
+        self._lock = threading.Lock()
+
+    def _work(self):
+        while True:
+            job = self.in_queue.get()
+            if job is DONE:
+                self.in_queue.put(DONE)  # let the sibling workers see it too
+                break
+            if job.error is None:
+                try:
+                    self.fn(job)
+                except Exception as e:
+                    job.error = f"{self.name}: {e}"
+            self.out_queue.put(job)
+
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last:
+            self.out_queue.put(DONE)
+
+    def start(self) -> "Stage":
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True).start()
+        return self
@@ -0,0 +1,171 @@
+"""
+Transcoding stage of the video pipeline.
+
+Converts source videos to infinitely looping WebPs with FFmpeg. Several ffmpeg processes
+run in parallel, sized so that workers x threads per ffmpeg roughly matches the cores
+available to this process.
+
+Besides converting a downloaded file, ffmpeg can be fed the HTTP response body on stdin
+or read the URL itself, which avoids writing the source video to disk at all.
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Iterable
+
+WEBP_QUALITY = 80  # Quality setting for WebP (0-100)
+
+# Threads each ffmpeg process may use. libwebp encodes on one thread, so most of the
+# speedup comes from running several ffmpeg processes, not from more threads per process.
+FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", "2"))
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects CPU affinity, e.g. in containers)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def transcode_workers(threads: int = FFMPEG_THREADS) -> int:
+    """Number of parallel ffmpeg processes: TRANSCODE_WORKERS, or cores / threads per ffmpeg."""
+    configured = int(os.getenv("TRANSCODE_WORKERS", "0"))
+    return configured or max(1, available_cores() // max(1, threads))
+
+
+def webp_command(input_spec: str, output_path: str, threads: int = FFMPEG_THREADS, input_options=()) -> list:
+    """FFmpeg command converting `input_spec` (a path, a URL or `pipe:0`) to a looping WebP."""
+    # No scaling filter - preserves original video dimensions
+    return [
+        'ffmpeg',
+        '-threads', str(threads),
+        *input_options,
+        '-i', input_spec,
+        '-c:v', 'libwebp',
+        '-loop', '0',           # Infinite looping
+        '-q:v', str(WEBP_QUALITY),  # Quality setting
+        '-preset', 'default',
+        '-y',                   # Overwrite output file
+        output_path
+    ]
+
+
+def convert_to_webp(input_path: str, output_path: str, threads: int = FFMPEG_THREADS) -> bool:
+    """Convert video to infinitely looping WebP using FFmpeg."""
+    try:
+        result = subprocess.run(webp_command(input_path, output_path, threads), capture_output=True, text=True)
+
+        if result.returncode == 0:
+            return True
+        else:
+            print(f"  FFmpeg error converting {input_path}: {result.stderr}")
+            return False
+
+    except Exception as e:
+        print(f"  Error converting {input_path} to WebP: {e}")
+        return False
+
+
+def convert_url_to_webp(url: str, output_path: str, user_agent: str, threads: int = FFMPEG_THREADS) -> bool:
+    """Let ffmpeg read `url` itself; it seeks with HTTP range requests when the container needs it."""
+    try:
+        cmd = webp_command(url, output_path, threads, input_options=('-user_agent', user_agent))
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode == 0:
+            return True
+        print(f"  FFmpeg error converting {url}: {result.stderr}")
+        return False
+    except Exception as e:
+        print(f"  Error converting {url} to WebP: {e}")
+        return False
+
+
+def convert_stream_to_webp(chunks: Iterable[bytes], output_path: str, threads: int = FFMPEG_THREADS) -> bool:
+    """
+    Pipe `chunks` of the source video into ffmpeg's stdin. Only the OS pipe buffer and the
+    current chunk are held in memory. Does not work for inputs that need seeking (see
+    `needs_seeking`); ffmpeg then fails and the caller should fall back to a file.
+    """
+    # stderr goes to a file: a pipe could fill up and block ffmpeg while we block on stdin
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            webp_command('pipe:0', output_path, threads),
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr,
+        )
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its return code and stderr say why
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = process.wait()
+
+        if returncode == 0:
+            return True
+        stderr.seek(0)
+        print(f"  FFmpeg error converting stream: {stderr.read().decode(errors='replace')[-2000:]}")
+        return False
+
+
+def needs_seeking(head: bytes) -> bool:
+    """
+    Whether a source starting with `head` must be read from a seekable file.
+
+    MP4/MOV files whose index box ('moov') comes after the media data ('mdat') cannot be
+    decoded from a pipe, so this walks the top-level boxes in `head` to see which comes first.
+    Other containers are assumed to be streamable.
+    """
+    if head[4:8] != b"ftyp":
+        return False
+    offset = 0
+    while offset + 8 <= len(head):
+        size = int.from_bytes(head[offset:offset + 4], "big")
+        kind = head[offset + 4:offset + 8]
+        if kind == b"moov":
+            return False
+        if kind == b"mdat":
+            return True
+        if size == 1:  # 64-bit box size follows the type
+            if offset + 16 > len(head):
+                break
+            size = int.from_bytes(head[offset + 8:offset + 16], "big")
+        if size < 8:
+            break
+        offset += size
+    return True  # no moov within the head; play it safe
+
+
+class Throughput:
+    """Thread-safe throughput counter for a pipeline stage."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.bytes = 0
+        self.busy = 0.0  # seconds spent inside the stage, summed over workers
+        self._lock = threading.Lock()
+
+    def add(self, nbytes: int, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.bytes += nbytes
+            self.busy += seconds
+
+    def summary(self) -> str:
+        with self._lock:
+            elapsed = max(time.perf_counter() - self.started, 1e-9)
+            return (
+                f"{self.count} videos in {elapsed:.1f}s "
+                f"({self.count / elapsed:.2f} videos/s, {self.bytes / elapsed / 1e6:.1f} MB/s of source video, "
+                f"{self.busy / elapsed:.1f} ffmpeg processes busy on average)"
+            )
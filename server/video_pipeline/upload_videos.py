@@ -2,22 +2,34 @@
 """
 Script to upload video names and URLs from videos.json to the database.
 Also converts videos to infinitely looping WebP format and saves them locally.
-Reads from ./data/videos.json relative to this script's directory
-and creates Video records in the database with corresponding WebP files.
+Reads from ./data/videos.json relative to this script's directory (or --input, which may
+also be newline-delimited JSON or CSV) and creates Video records in the database with
+corresponding WebP files. The input is streamed, so its size does not affect memory use.
+
+Progress is recorded in a manifest (./data/manifest.sqlite), so a rerun only does the
+work that is left: finished videos are skipped and interrupted ones resume where they
+stopped. Pass --clean to start from scratch.
 """
 
 import sys
-import json
+import argparse
+import hashlib
 import os
+import itertools
+import queue
 import shutil
-import subprocess
-import requests
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from pathlib import Path
 
 # Configuration constants
-MAX_VIDEOS_TO_PROCESS = 20  # Maximum number of videos to process
-WEBP_QUALITY = 80           # Quality setting for WebP (0-100)
+# How sources reach ffmpeg: "file" downloads to temp_videos/ first, "pipe" streams the HTTP
+# body into ffmpeg's stdin, "url" lets ffmpeg fetch the URL. The streaming modes fall back to
+# a temp file for sources that need seeking.
+STREAM_MODE = os.getenv("STREAM_MODE", "file")
+STREAM_MODES = ("file", "pipe", "url")
+HEAD_BYTES = 256 * 1024  # bytes inspected to decide whether a piped source needs seeking
+REGISTER_BATCH_SIZE = 100  # videos registered in the database per statement
 
 # Add the server directory to the Python path so we can import from it
 current_dir = Path(__file__).resolve().parent
@@ -27,92 +39,38 @@ if str(server_dir) not in sys.path:
 
 from app import create_app
 from extensions import db
-from db.models import Video
+from db.bulk import upsert_videos
+from video_pipeline.download import (
+    Downloader, DOWNLOAD_WORKERS, DOWNLOAD_PER_HOST, DOWNLOAD_RETRIES, HEADERS, CHUNK_SIZE,
+)
+from video_pipeline.manifest import Manifest
+from video_pipeline.readers import read_videos, detect_format, FORMATS
+from video_pipeline.stages import VideoJob, Stage, QUEUE_SIZE, feed, drain
+from video_pipeline.transcode import (
+    convert_to_webp, convert_stream_to_webp, convert_url_to_webp, needs_seeking, transcode_workers, Throughput,
+    WEBP_QUALITY, FFMPEG_THREADS,
+)
+
+TEMP_DIR = current_dir / "temp_videos"
+WEBP_DIR = current_dir / "webp_output"
+VIDEOS_PATH = current_dir / "data" / "videos.json"
+MANIFEST_PATH = current_dir / "data" / "manifest.sqlite"
 
 def clear_output_directories():
     """Clear previous output directories to start fresh."""
-    current_dir = Path(__file__).parent
-    temp_dir = current_dir / "temp_videos"
-    webp_dir = current_dir / "webp_output"
-    
     # Remove and recreate temp_videos directory
-    if temp_dir.exists():
-        shutil.rmtree(temp_dir)
-        print(f"Cleared {temp_dir}")
-    temp_dir.mkdir(exist_ok=True)
-    
-    # Remove and recreate webp_output directory
-    if webp_dir.exists():
-        shutil.rmtree(webp_dir)
-        print(f"Cleared {webp_dir}")
-    webp_dir.mkdir(exist_ok=True)
-    
-    print("Output directories cleared and recreated")
+    if TEMP_DIR.exists():
+        shutil.rmtree(TEMP_DIR)
+        print(f"Cleared {TEMP_DIR}")
+    TEMP_DIR.mkdir(exist_ok=True)
 
-def download_video(video_url: str, output_path: str) -> bool:
-    """Download video from URL to local path using requests with proper SSL handling."""
-    try:
-        print(f"  Downloading {video_url}...")
-        
-        # Use browser-like headers to avoid bot detection
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(video_url, headers=headers, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        # Download in chunks
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-        
-        # Verify file was downloaded and has content
-        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-            print(f"  Downloaded ({os.path.getsize(output_path)} bytes)")
-            return True
-        else:
-            print(f"  Download failed: file is empty or doesn't exist")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"  Request error downloading: {e}")
-        return False
-    except Exception as e:
-        print(f"  Error downloading: {e}")
-        return False
+    # Remove and recreate webp_output directory
+    if WEBP_DIR.exists():
+        shutil.rmtree(WEBP_DIR)
+        print(f"Cleared {WEBP_DIR}")
+    WEBP_DIR.mkdir(exist_ok=True)
 
-def convert_to_webp(input_path: str, output_path: str) -> bool:
-    """Convert video to infinitely looping WebP using FFmpeg."""
-    try:
-        print(f"  Converting to WebP...")
-        
-        # FFmpeg command to convert video to infinitely looping WebP
-        # No scaling filter - preserves original video dimensions
-        cmd = [
-            'ffmpeg',
-            '-i', input_path,
-            '-c:v', 'libwebp',
-            '-loop', '0',           # Infinite looping
-            '-q:v', str(WEBP_QUALITY),  # Quality setting
-            '-preset', 'default',
-            '-y',                   # Overwrite output file
-            output_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print(f"  Successfully converted to WebP")
-            return True
-        else:
-            print(f"  FFmpeg error: {result.stderr}")
-            return False
-            
-    except Exception as e:
-        print(f"  Error converting to WebP: {e}")
-        return False
+    print("Output directories cleared and recreated")
 
 def cleanup_temp_file(file_path: str) -> None:
     """Remove temporary file."""
@@ -122,156 +80,337 @@ def cleanup_temp_file(file_path: str) -> None:
     except Exception as e:
         print(f"  Warning: Could not clean up {file_path}: {e}")
 
-def load_videos_json(file_path: str) -> List[Dict[str, Any]]:
-    """Load videos data from JSON file."""
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_videos(file_path: Path, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream video entries from the input file without loading it into memory. Malformed
+    input ends the stream with an error message; entries before it are still processed.
+    """
+    count = 0
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        print(f"Loaded {len(data)} videos from {file_path}")
-        return data
-    except FileNotFoundError:
-        print(f"Error: File {file_path} not found")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in {file_path}: {e}")
-        return []
-
-def upload_videos_to_db(videos_data: List[Dict[str, Any]]) -> None:
-    """Upload video data to the database and convert to WebP."""
-    current_dir = Path(__file__).parent
-    temp_dir = current_dir / "temp_videos"
-    webp_dir = current_dir / "webp_output"
-    
-    uploaded_count = 0
-    skipped_count = 0
-    error_count = 0
-    webp_success_count = 0
-    webp_error_count = 0
-    
-    # Limit to MAX_VIDEOS_TO_PROCESS
-    videos_to_process = videos_data[:MAX_VIDEOS_TO_PROCESS]
-    print(f"Processing {len(videos_to_process)} videos (limited to {MAX_VIDEOS_TO_PROCESS})")
-    
-    for i, video_data in enumerate(videos_to_process, 1):
-        try:
-            video_name = video_data.get('video_name')
-            video_url = video_data.get('video_url')
-            
-            print(f"\n[{i}/{len(videos_to_process)}] Processing: {video_name}")
-            
-            if not video_name or not video_url:
-                print(f"  Warning: Missing video_name or video_url")
-                skipped_count += 1
-                continue
-            
-            # Check if video already exists (by path/URL)
-            existing_video = Video.query.filter_by(path=video_url).first()
-            if existing_video:
-                print(f"  Skipping - already exists with ID {existing_video.id}")
-                skipped_count += 1
+        for entry in read_videos(file_path, fmt):
+            count += 1
+            yield entry
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not read {file_path}: {e}")
+    print(f"Read {count} videos from {file_path}")
+
+def job_paths(video_name: str, video_url: str):
+    """
+    Temp and WebP paths of a video. They carry a hash of the URL, so entries sharing a name
+    neither overwrite each other's files while in flight nor share a WebP, and a rerun finds
+    the files of the same URL again.
+    """
+    key = hashlib.sha256(video_url.encode()).hexdigest()[:12]
+    return TEMP_DIR / f"{key}-{video_name}", WEBP_DIR / f"{video_name.rsplit('.', 1)[0]}-{key}.webp"
+
+def plan_jobs(videos_data: Iterable[Dict[str, Any]], manifest: Manifest, stats: Dict[str, int]) -> Iterator[VideoJob]:
+    """
+    Turn videos.json entries into jobs, lazily. Videos the manifest records as converted and
+    registered are skipped; converted but unregistered ones only go through registration.
+    """
+    for i, video_data in enumerate(videos_data, 1):
+        video_name = video_data.get('video_name')
+        video_url = video_data.get('video_url')
+
+        if not video_name or not video_url:
+            print(f"[{i}] Warning: Missing video_name or video_url")
+            stats["skipped"] += 1
+            continue
+
+        temp_path, webp_path = job_paths(video_name, video_url)
+        job = VideoJob(index=i, name=video_name, url=video_url, temp_path=temp_path, webp_path=webp_path)
+
+        row = manifest.get(video_url)
+        if row and row["converted_at"] and row["webp_path"] and Path(row["webp_path"]).exists():
+            if row["registered_at"]:
+                stats["done"] += 1
                 continue
-            
-            # Generate file paths
-            temp_video_path = temp_dir / video_name
-            webp_name = video_name.rsplit('.', 1)[0] + '.webp'
-            webp_output_path = webp_dir / webp_name
-            
-            # Download and convert video to WebP
-            webp_success = False
-            try:
-                if download_video(video_url, str(temp_video_path)):
-                    if convert_to_webp(str(temp_video_path), str(webp_output_path)):
-                        webp_success = True
-                        webp_success_count += 1
-                        print(f"  ✅ WebP conversion successful")
-                    else:
-                        webp_error_count += 1
-                        print(f"  ❌ WebP conversion failed")
-                else:
-                    webp_error_count += 1
-                    print(f"  ❌ Video download failed")
-            except Exception as e:
-                webp_error_count += 1
-                print(f"  ❌ WebP processing error: {e}")
-            finally:
-                # Always clean up temporary video file
-                cleanup_temp_file(str(temp_video_path))
-            
-            # Create database record regardless of WebP success
-            # In the future, you might want to store webp_path in the database
-            new_video = Video(
-                name=video_name,
-                path=video_url  # Using path field to store the video URL
-                # TODO: Add webp_path field to store WebP file path/URL
-            )
-            
-            db.session.add(new_video)
-            uploaded_count += 1
-            print(f"  ✅ Database record created")
-            
-            # Commit every 10 records to avoid memory issues and provide progress
-            if uploaded_count % 10 == 0:
-                db.session.commit()
-                print(f"\n--- Progress: {uploaded_count} videos uploaded, {webp_success_count} WebPs created ---")
-                
-        except Exception as e:
-            print(f"  ❌ Error processing video: {e}")
-            error_count += 1
-            db.session.rollback()
-    
-    # Final commit
+            # Converted in an earlier run that stopped before registering it
+            job.downloaded = job.converted = True
+            job.webp_path = Path(row["webp_path"])
+            job.content_hash = row["content_hash"]
+
+        manifest.start(video_url, video_name)
+        yield job
+
+def download_job(downloader: Downloader, manifest: Manifest, job: VideoJob) -> None:
+    """Download stage: fetch the source video into the temp directory."""
+    if job.converted:
+        return
+
+    # A temp file left by an interrupted run is reused if it matches the recorded content
+    row = manifest.get(job.url)
+    if row and row["content_hash"] and job.temp_path.exists() and file_sha256(job.temp_path) == row["content_hash"]:
+        print(f"  Resuming {job.name} from {job.temp_path}")
+        job.downloaded = True
+    else:
+        started = time.perf_counter()
+        job.downloaded = downloader.download(job.url, str(job.temp_path))
+        job.timings["download"] = time.perf_counter() - started
+
+    if job.downloaded:
+        job.source_bytes = os.path.getsize(job.temp_path)
+        job.content_hash = file_sha256(job.temp_path)
+        manifest.mark_downloaded(job.url, job.content_hash)
+
+def reuse_conversion(manifest: Manifest, job: VideoJob) -> bool:
+    """Copy the WebP of an earlier video with identical content instead of transcoding again."""
+    existing = manifest.converted_with_hash(job.content_hash) if job.content_hash else None
+    if not existing:
+        return False
+    if Path(existing) != job.webp_path:
+        shutil.copyfile(existing, job.webp_path)
+    print(f"  Reusing WebP of identical content for {job.name}")
+    return True
+
+def transcode_job(manifest: Manifest, job: VideoJob, throughput: Throughput) -> None:
+    """Transcode stage: convert the downloaded video to WebP and drop the temp file."""
+    if job.converted:
+        return
+    try:
+        if job.downloaded:
+            started = time.perf_counter()
+            job.converted = reuse_conversion(manifest, job) or convert_to_webp(str(job.temp_path), str(job.webp_path))
+            job.timings["transcode"] = time.perf_counter() - started
+            if job.converted:
+                throughput.add(job.source_bytes, job.timings["transcode"])
+                manifest.mark_converted(job.url, str(job.webp_path))
+    finally:
+        # Always clean up temporary video file
+        cleanup_temp_file(str(job.temp_path))
+
+def read_head(chunks, size: int):
+    """Buffer at least `size` bytes from the iterator `chunks` (fewer if it ends first)."""
+    head = bytearray()
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= size:
+            break
+    return bytes(head)
+
+def counted(chunks, job: VideoJob, digest):
+    """Pass `chunks` through, adding their size to `job.source_bytes` and their content to `digest`."""
+    for chunk in chunks:
+        job.source_bytes += len(chunk)
+        digest.update(chunk)
+        yield chunk
+
+def stream_job(downloader: Downloader, manifest: Manifest, job: VideoJob, throughput: Throughput, mode: str) -> None:
+    """
+    Stream stage: convert straight from the network without a temp file, falling back to
+    the download and transcode stages for sources that cannot be converted that way.
+    In url mode the content never passes through this process, so it is not hashed.
+    """
+    if job.converted:
+        return
+
+    started = time.perf_counter()
+    if mode == "url":
+        job.converted = convert_url_to_webp(job.url, str(job.webp_path), HEADERS['User-Agent'])
+    else:
+        with downloader.stream(job.url) as response:
+            chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+            head = read_head(chunks, HEAD_BYTES)
+            if head and not needs_seeking(head):
+                digest = hashlib.sha256()
+                job.converted = convert_stream_to_webp(
+                    counted(itertools.chain([head], chunks), job, digest), str(job.webp_path)
+                )
+                job.content_hash = digest.hexdigest()
+    job.timings["stream"] = time.perf_counter() - started
+
+    if job.converted:
+        job.downloaded = True
+        throughput.add(job.source_bytes, job.timings["stream"])
+        if job.content_hash:
+            manifest.mark_downloaded(job.url, job.content_hash)
+        manifest.mark_converted(job.url, str(job.webp_path))
+        return
+
+    print(f"  Streaming {job.url} failed or needs seeking, falling back to a temp file")
+    job.source_bytes = 0
+    job.content_hash = None
+    download_job(downloader, manifest, job)
+    transcode_job(manifest, job, throughput)
+
+def register_videos(jobs: List[VideoJob], manifest: Manifest) -> int:
+    """Upsert a batch of videos on their path (the source URL) and record their ids."""
+    # The last job wins if a URL occurs twice in the batch
+    rows = {job.url: {"path": job.url, "name": job.name, "aspect_ratio": None, "genre": None} for job in jobs}
+    written = upsert_videos(list(rows.values()))
+    db.session.commit()
+    for video_id, path, _ in written:
+        manifest.mark_registered(path, video_id)
+    return len(written)
+
+def register_batch(jobs: List[VideoJob], manifest: Manifest):
+    """Register `jobs`, reporting a failure instead of raising. Returns `(registered, failed)`."""
     try:
-        db.session.commit()
-        print(f"\n{'='*60}")
-        print(f"UPLOAD COMPLETE!")
-        print(f"{'='*60}")
-        print(f"Database records:")
-        print(f"  Successfully uploaded: {uploaded_count} videos")
-        print(f"  Skipped (already exist): {skipped_count} videos")
-        print(f"  Errors: {error_count} videos")
-        print(f"\nWebP conversions:")
-        print(f"  Successfully converted: {webp_success_count} WebPs")
-        print(f"  Failed conversions: {webp_error_count} WebPs")
-        print(f"\nWebP files saved to: {webp_dir}")
-        print(f"{'='*60}")
+        return register_videos(jobs, manifest), 0
     except Exception as e:
-        print(f"Error during final commit: {e}")
+        print(f"  ❌ Error registering videos: {e}")
         db.session.rollback()
+        for job in jobs:
+            manifest.mark_failed(job.url, f"register: {e}")
+        return 0, len(jobs)
+
+def upload_videos_to_db(videos_data: Iterable[Dict[str, Any]], manifest: Manifest,
+                        stream_mode: str = STREAM_MODE) -> None:
+    """
+    Upload video data to the database and convert to WebP.
+
+    Jobs flow through two stages connected by bounded queues: concurrent downloads, then
+    parallel ffmpeg transcodes. This thread registers videos in batches as they come out
+    of the transcode stage, so network transfers, conversions and database writes all
+    overlap. With a streaming `stream_mode` both stages collapse into one that feeds ffmpeg
+    from the network (see `stream_job`). Each step is recorded in `manifest`.
+    """
+    TEMP_DIR.mkdir(exist_ok=True)
+    WEBP_DIR.mkdir(exist_ok=True)
+
+    stats = {"skipped": 0, "done": 0}
+    uploaded_count = 0
+    error_count = 0
+    webp_success_count = 0
+    webp_error_count = 0
+
+    # Start the stages; each hands its jobs over to the next through a bounded queue
+    downloader = Downloader()
+    workers = transcode_workers()
+    throughput = Throughput()
+    pending_jobs = queue.Queue(maxsize=QUEUE_SIZE)
+    transcoded_jobs = queue.Queue(maxsize=QUEUE_SIZE)
+    feed(plan_jobs(videos_data, manifest, stats), pending_jobs)
+    if stream_mode == "file":
+        downloaded_jobs = queue.Queue(maxsize=QUEUE_SIZE)
+        Stage("download", lambda job: download_job(downloader, manifest, job), downloader.workers,
+              pending_jobs, downloaded_jobs).start()
+        Stage("transcode", lambda job: transcode_job(manifest, job, throughput), workers,
+              downloaded_jobs, transcoded_jobs).start()
+        print(f"Downloading with {downloader.workers} workers, transcoding with {workers} ffmpeg processes")
+    else:
+        Stage("stream", lambda job: stream_job(downloader, manifest, job, throughput, stream_mode), workers,
+              pending_jobs, transcoded_jobs).start()
+        print(f"Streaming ({stream_mode}) into {workers} ffmpeg processes")
+
+    batch = []
+    for job in drain(transcoded_jobs):
+        print(f"\n[{job.index}] Processed: {job.name}")
+        cleanup_temp_file(str(job.temp_path))  # left behind if a stage failed with an error
+        if job.converted:
+            webp_success_count += 1
+            print(f"  ✅ WebP conversion successful")
+        elif job.downloaded:
+            webp_error_count += 1
+            print(f"  ❌ WebP conversion failed{f': {job.error}' if job.error else ''}")
+        else:
+            webp_error_count += 1
+            print(f"  ❌ Video download failed{f': {job.error}' if job.error else ''}")
+        if not job.converted:
+            manifest.mark_failed(job.url, job.error or ("conversion failed" if job.downloaded else "download failed"))
+
+        # Register the video regardless of WebP success; failed conversions are retried next run
+        # In the future, you might want to store webp_path in the database
+        batch.append(job)
+        if len(batch) >= REGISTER_BATCH_SIZE:
+            registered, failed = register_batch(batch, manifest)
+            uploaded_count += registered
+            error_count += failed
+            print(f"\n--- Progress: {uploaded_count} videos uploaded, {webp_success_count} WebPs created ---")
+            print(f"--- Transcoding: {throughput.summary()} ---")
+            batch = []
 
-def main():
+    # Final batch
+    if batch:
+        registered, failed = register_batch(batch, manifest)
+        uploaded_count += registered
+        error_count += failed
+
+    print(f"\n{'='*60}")
+    print(f"UPLOAD COMPLETE!")
+    print(f"{'='*60}")
+    print(f"Database records:")
+    print(f"  Successfully uploaded: {uploaded_count} videos")
+    print(f"  Skipped (already done in an earlier run): {stats['done']} videos")
+    print(f"  Skipped (missing name or URL): {stats['skipped']} videos")
+    print(f"  Errors: {error_count} videos")
+    print(f"\nWebP conversions:")
+    print(f"  Successfully converted: {webp_success_count} WebPs")
+    print(f"  Failed conversions: {webp_error_count} WebPs")
+    print(f"  Throughput: {throughput.summary()}")
+    print(f"\nWebP files saved to: {WEBP_DIR}")
+    print(f"Manifest: {manifest.path} ({manifest.counts()})")
+    print(f"{'='*60}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", type=Path, default=VIDEOS_PATH, help="Videos to process (default data/videos.json)")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Input format (default from the file suffix: .json, .ndjson/.jsonl or .csv)")
+    parser.add_argument("--limit", type=int, help="Only consider the first N entries of the input")
+    parser.add_argument("--clean", action="store_true",
+                        help="Delete previous WebPs, temp files and the manifest before running")
+    parser.add_argument("--stream-mode", choices=STREAM_MODES, default=STREAM_MODE,
+                        help="How sources reach ffmpeg (default from STREAM_MODE)")
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_PATH, help="Manifest database path")
+    args = parser.parse_args(argv)
+    # argparse does not check defaults against choices, so a bad STREAM_MODE gets here
+    if args.stream_mode not in STREAM_MODES:
+        parser.error(f"STREAM_MODE must be one of {', '.join(STREAM_MODES)}, not {args.stream_mode!r}")
+    return args
+
+def main(argv=None):
     """Main function to run the upload script."""
-    # Define the path to the videos.json file relative to this script
-    # Expected structure: video_pipeline/data/videos.json
-    current_dir = Path(__file__).parent
-    json_file_path = current_dir / "data" / "videos.json"
-    
-    # Check if the videos.json file exists
-    if not json_file_path.exists():
-        print(f"Error: videos.json file not found at {json_file_path}")
+    args = parse_args(argv)
+
+    # Expected structure: video_pipeline/data/videos.json, unless --input says otherwise
+    input_path = args.input
+
+    # Check if the input file exists
+    if not input_path.exists():
+        print(f"Error: input file not found at {input_path}")
         print("Please ensure the videos.json file is placed in the data/ directory")
         return
-    
+
     print("="*60)
     print("VIDEO UPLOAD & WEBP CONVERSION SCRIPT")
     print("="*60)
-    print(f"Max videos to process: {MAX_VIDEOS_TO_PROCESS}")
+    print(f"Max videos to process: {args.limit or 'all'}")
+    print(f"Download workers: {DOWNLOAD_WORKERS} ({DOWNLOAD_PER_HOST} per host, {DOWNLOAD_RETRIES} retries)")
     print(f"WebP settings: Original dimensions preserved, quality {WEBP_QUALITY}")
-    print(f"Loading videos from: {json_file_path}")
-    print()
-    
-    # Clear previous output directories
-    clear_output_directories()
+    print(f"Transcode workers: {transcode_workers()} ({FFMPEG_THREADS} threads per ffmpeg)")
+    print(f"Stream mode: {args.stream_mode}")
+    print(f"Loading videos from: {input_path} ({args.format or detect_format(input_path)})")
     print()
-    
-    # Load videos data
-    videos_data = load_videos_json(str(json_file_path))
-    if not videos_data:
+
+    manifest = Manifest(args.manifest)
+    if args.clean:
+        # Clear previous output directories
+        clear_output_directories()
+        manifest.clear()
+        print("Manifest cleared")
+        print()
+
+    # Stream videos data; entries are read as the pipeline's queues make room for them
+    videos_data = load_videos(input_path, args.format)
+    if args.limit:
+        videos_data = itertools.islice(videos_data, args.limit)
+    first = next(videos_data, None)
+    if first is None:
         print("No videos to upload. Exiting.")
         return
-    
+    videos_data = itertools.chain([first], videos_data)
+
     # Create Flask app and database context
     app = create_app()
-    
+
     with app.app_context():
         # Check database connection
         try:
@@ -281,9 +420,12 @@ def main():
         except Exception as e:
             print(f"Error connecting to database: {e}")
             return
-        
+
         # Upload videos and convert to WebP
-        upload_videos_to_db(videos_data)
+        try:
+            upload_videos_to_db(videos_data, manifest, args.stream_mode)
+        finally:
+            manifest.close()
 
 if __name__ == "__main__":
     main()